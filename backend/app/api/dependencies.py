@@ -0,0 +1,42 @@
+"""
+Shared dependency providers for the API routers.
+Follows Single Responsibility Principle - handles only service injection.
+"""
+from fastapi import Depends, Request
+
+from app.services.ai_service import AIService
+from app.services.email_service import EmailService
+from app.services.gmail_service import GmailService
+from app.core.gmail_pool import gmail_pool
+from app.core.ai_service_pool import ai_service_pool
+
+
+def raise_ai_service_error(request: Request):
+    """Re-raise the cached AI service construction error, if startup recorded one."""
+    error = request.app.state.ai_service_error
+    if error is not None:
+        # Raise a fresh copy so tracebacks don't accumulate on the shared instance
+        raise type(error)(*error.args)
+
+
+def get_gmail_service(request: Request) -> GmailService:
+    """Dependency injection for Gmail service with session support."""
+    session_id = request.state.ctx.session_id
+    return gmail_pool.get_or_create(session_id)
+
+
+def get_email_service(gmail_service: GmailService = Depends(get_gmail_service)) -> EmailService:
+    """Dependency injection for email service with session support."""
+    return EmailService(gmail_service=gmail_service)
+
+
+def get_ai_service(request: Request) -> AIService:
+    """Dependency injection for the shared AI service built at startup."""
+    raise_ai_service_error(request)
+    return request.app.state.ai_service
+
+
+def get_session_ai_service(request: Request) -> AIService:
+    """Dependency injection for AI service; Gmail is pulled from the pool only when needed."""
+    raise_ai_service_error(request)
+    return ai_service_pool.get_or_create(request.state.ctx.session_id)
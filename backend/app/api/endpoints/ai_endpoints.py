@@ -3,36 +3,45 @@ AI-related API endpoints.
 Follows Single Responsibility Principle - handles only AI API operations.
 """
 import logging
-from fastapi import APIRouter, HTTPException, Depends
-from fastapi.responses import JSONResponse
+from functools import lru_cache
+import orjson
+from fastapi import APIRouter, HTTPException, Depends, Response
+from fastapi.responses import ORJSONResponse
 
 from app.services.ai_service import AIService
+from app.api.dependencies import get_ai_service
 from app.core.exceptions import AIServiceException, APIKeyMissingException
 
 # Configure logger
 logger = logging.getLogger(__name__)
 
-router = APIRouter(tags=["ai"])
+router = APIRouter(tags=["ai"], default_response_class=ORJSONResponse)
 
 
-def get_ai_service() -> AIService:
-    """Dependency injection for AI service."""
-    logger.debug("🔧 Creating AI service instance for dependency injection")
-    try:
-        # Note: AI endpoints don't need Gmail service dependency for basic operations
-        # Gmail service dependency is handled in email endpoints where it's needed
-        service = AIService()
-        logger.debug("✅ AI service instance created successfully")
-        return service
-    except Exception as e:
-        logger.error(f"❌ Failed to create AI service instance: {str(e)}")
-        raise
+@lru_cache(maxsize=8)
+def _provider_body(provider_name: str) -> bytes:
+    """Serialized provider response; the provider only changes on restart."""
+    return orjson.dumps({
+        "provider": provider_name,
+        "status": "active"
+    })
+
+
+@lru_cache(maxsize=8)
+def _health_body(provider_name: str) -> bytes:
+    """Serialized healthy response, rebuilt only when the provider changes."""
+    return orjson.dumps({
+        "status": "healthy",
+        "provider": provider_name,
+        "service": "ai-service",
+        "capabilities": ["email_summarization", "response_generation"]
+    })
 
 
 @router.get("/provider")
 async def get_ai_provider(
     ai_service: AIService = Depends(get_ai_service)
-) -> JSONResponse:
+) -> Response:
     """
     Get the current AI provider being used.
     
@@ -43,28 +52,21 @@ async def get_ai_provider(
     
     try:
         provider_name = ai_service.get_provider_name()
-        logger.info(f"✅ AI provider retrieved: {provider_name}")
+        logger.info("✅ AI provider retrieved: %s", provider_name)
         
-        response_data = {
-            "provider": provider_name,
-            "status": "active"
-        }
-        
-        logger.debug(f"📤 Returning provider response: {response_data}")
-        return JSONResponse(content=response_data)
+        body = _provider_body(provider_name)
+        logger.debug("📤 Returning provider response: %s", body)
+        return Response(content=body, media_type="application/json")
         
     except APIKeyMissingException as e:
-        logger.error(f"❌ AI service unavailable - API key missing: {str(e)}")
+        logger.error("❌ AI service unavailable - API key missing: %s", e)
         raise HTTPException(status_code=503, detail=f"AI service unavailable: {str(e)}")
-    except Exception as e:
-        logger.error(f"💥 Unexpected error in get_ai_provider: {str(e)}", exc_info=True)
-        raise HTTPException(status_code=500, detail="Internal server error")
 
 
 @router.get("/health")
 async def ai_health_check(
     ai_service: AIService = Depends(get_ai_service)
-) -> JSONResponse:
+) -> Response:
     """
     Health check for AI service.
     
@@ -75,21 +77,15 @@ async def ai_health_check(
     
     try:
         provider_name = ai_service.get_provider_name()
-        logger.info(f"✅ AI service health check passed - Provider: {provider_name}")
-        
-        response_data = {
-            "status": "healthy",
-            "provider": provider_name,
-            "service": "ai-service",
-            "capabilities": ["email_summarization", "response_generation"]
-        }
+        logger.info("✅ AI service health check passed - Provider: %s", provider_name)
         
-        logger.debug(f"📤 Returning health check response: {response_data}")
-        return JSONResponse(content=response_data)
+        body = _health_body(provider_name)
+        logger.debug("📤 Returning health check response: %s", body)
+        return Response(content=body, media_type="application/json")
         
     except APIKeyMissingException as e:
-        logger.warning(f"⚠️ AI service unhealthy - API key missing: {str(e)}")
-        return JSONResponse(
+        logger.warning("⚠️ AI service unhealthy - API key missing: %s", e)
+        return ORJSONResponse(
             status_code=503,
             content={
                 "status": "unhealthy",
@@ -98,8 +94,8 @@ async def ai_health_check(
             }
         )
     except Exception as e:
-        logger.error(f"💥 AI service health check failed: {str(e)}", exc_info=True)
-        return JSONResponse(
+        logger.error("💥 AI service health check failed: %s", e, exc_info=True)
+        return ORJSONResponse(
             status_code=500,
             content={
                 "status": "error",
@@ -2,26 +2,46 @@
 Authentication-related API endpoints.
 Handles Gmail OAuth2 authentication flow.
 """
+import asyncio
+import hashlib
 import logging
-from fastapi import APIRouter, HTTPException, Depends, Query, Request
-from fastapi.responses import RedirectResponse, JSONResponse
-from typing import Dict, Any
+import os
+import orjson
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
+from fastapi.responses import RedirectResponse, ORJSONResponse
+from typing import Dict, Any, Optional
 from datetime import datetime
 
 from app.services.gmail_service import GmailService
 from app.core.exceptions import EmailProcessingException
 from app.core.session_manager import session_manager
+from app.core.gmail_pool import gmail_pool, run_gmail
+from app.core.ai_service_pool import ai_service_pool
+from app.api.dependencies import get_gmail_service
 
 logger = logging.getLogger(__name__)
 
 
-router = APIRouter(tags=["authentication"])
+router = APIRouter(tags=["authentication"], default_response_class=ORJSONResponse)
 
+# Health check payload never changes, so serialize it once
+_HEALTH_BODY = orjson.dumps({
+    "status": "healthy",
+    "service": "auth-service",
+    "version": "1.0.0"
+})
 
-def get_gmail_service(request: Request) -> GmailService:
-    """Dependency injection for Gmail service with session support."""
-    session_id = getattr(request.state, 'session_id', None)
-    return GmailService(session_id=session_id)
+
+def _auth_status_etag(session_id: Optional[str]) -> Optional[str]:
+    """Build an ETag for an authenticated session, or None if it cannot be tracked."""
+    if not session_id:
+        return None
+    session_data = session_manager.get_session(session_id)
+    authenticated_at = session_data.get("authenticated_at") if session_data else None
+    if not authenticated_at:
+        return None
+    digest = hashlib.blake2b(f"{session_id}:{authenticated_at}".encode(), digest_size=8).hexdigest()
+    return f'"{digest}"'
 
 
 @router.get("/gmail/url")
@@ -40,8 +60,6 @@ async def get_gmail_auth_url(
         return {"auth_url": auth_url}
     except EmailProcessingException as e:
         raise HTTPException(status_code=500, detail=f"Failed to get auth URL: {str(e)}")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail="Internal server error")
 
 
 @router.get("/gmail/callback")
@@ -60,29 +78,36 @@ async def gmail_auth_callback(
         Redirect to frontend with success/error status
     """
     try:
-        logger.info(f"🔐 OAuth callback received - Code: {code[:20]}..., State: {state}")
+        logger.info("🔐 OAuth callback received - Code: %s..., State: %s", code[:20], state)
         
         # Use the session ID from state parameter (passed from auth URL)
         target_session_id = state if state != "no_session" else None
+        # The session middleware already validated the state and only adopts it when valid
+        is_valid = target_session_id is not None and request.state.ctx.session_id == target_session_id
         
-        if target_session_id and session_manager.is_valid_session(target_session_id):
-            logger.info(f"🎯 Valid session found for callback: {target_session_id}")
+        if is_valid:
+            logger.info("🎯 Valid session found for callback: %s", target_session_id)
             # Create Gmail service with the correct session ID
-            gmail_service = GmailService(session_id=target_session_id)
-            success = gmail_service.authenticate_with_code(code)
+            gmail_service = await gmail_pool.aget_or_create(target_session_id)
+            success = await run_gmail(gmail_service, gmail_service.authenticate_with_code, code)
             
             if success:
-                logger.info(f"🎉 Gmail authentication successful for session: {target_session_id}")
+                logger.info("🎉 Gmail authentication successful for session: %s", target_session_id)
                 # Update session with user email
                 try:
-                    profile = gmail_service.get_user_profile()
+                    profile = await run_gmail(gmail_service, gmail_service.get_user_profile)
                     session_manager.update_session(target_session_id, {
                         "user_email": profile.get("email"),
                         "authenticated_at": datetime.now().isoformat()
                     })
-                    logger.info(f"✅ Successfully authenticated session {target_session_id} with {profile.get('email')}")
+                    logger.info("✅ Successfully authenticated session %s with %s", target_session_id, profile.get('email'))
                 except Exception as e:
-                    logger.warning(f"Warning: Could not update session with user email: {e}")
+                    logger.warning("Warning: Could not update session with user email: %s", e)
+                
+                # A cached AI service may still hold the previous account's reply name
+                ai_service = ai_service_pool.get(target_session_id)
+                if ai_service is not None:
+                    ai_service.reset_reply_name()
                 
                 # Redirect to frontend with success and session ID
                 return RedirectResponse(
@@ -90,9 +115,9 @@ async def gmail_auth_callback(
                     status_code=302
                 )
             else:
-                logger.error(f"❌ Gmail authentication failed for session: {target_session_id}")
+                logger.error("❌ Gmail authentication failed for session: %s", target_session_id)
         else:
-            logger.error(f"❌ Invalid or missing session for callback. State: {state}, Valid: {session_manager.is_valid_session(target_session_id) if target_session_id else False}")
+            logger.error("❌ Invalid or missing session for callback. State: %s, Valid: %s", state, is_valid)
         
         # If we get here, authentication failed
         return RedirectResponse(
@@ -114,23 +139,40 @@ async def gmail_auth_callback(
 @router.get("/gmail/status")
 async def get_gmail_auth_status(
     request: Request,
+    response: Response,
     gmail_service: GmailService = Depends(get_gmail_service)
 ) -> Dict[str, Any]:
     """
     Check Gmail authentication status.
     
+    Supports conditional requests: authenticated sessions carry an ETag derived
+    from the session's authentication time, and a matching If-None-Match gets a
+    304 without another Gmail profile lookup.
+    
     Returns:
         Authentication status and user profile if authenticated
     """
     # Debug logging
-    session_id = getattr(request.state, 'session_id', None)
+    session_id = request.state.ctx.session_id
     tab_id = request.headers.get("X-Tab-ID")
-    logger.info(f"🔍 Auth status check - Session ID: {session_id}, Tab ID: {tab_id}")
+    logger.info("🔍 Auth status check - Session ID: %s, Tab ID: %s", session_id, tab_id)
     
     try:
         if gmail_service.is_authenticated():
-            profile = gmail_service.get_user_profile()
-            logger.info(f"📊 Auth status result - Authenticated: True, User: {profile.get('email', 'Unknown')}")
+            etag = _auth_status_etag(session_id)
+            if etag:
+                cache_headers = {
+                    "ETag": etag,
+                    "Cache-Control": "private, no-cache",
+                    "Vary": "X-Tab-ID, Cookie"
+                }
+                if request.headers.get("If-None-Match") == etag:
+                    logger.info("📊 Auth status unchanged - returning 304")
+                    return Response(status_code=304, headers=cache_headers)
+                response.headers.update(cache_headers)
+            
+            profile = await run_gmail(gmail_service, gmail_service.get_user_profile)
+            logger.info("📊 Auth status result - Authenticated: True, User: %s", profile.get('email', 'Unknown'))
             return {
                 "authenticated": True,
                 "user_profile": profile
@@ -139,19 +181,28 @@ async def get_gmail_auth_status(
             logger.info("📊 Auth status result - Authenticated: False")
             return {"authenticated": False}
     except EmailProcessingException as e:
-        logger.error(f"❌ Auth status check failed with EmailProcessingException: {e}")
+        logger.error("❌ Auth status check failed with EmailProcessingException: %s", e)
         return {
             "authenticated": False,
             "error": str(e)
         }
     except Exception as e:
-        logger.error(f"❌ Auth status check failed with Exception: {e}")
+        logger.error("❌ Auth status check failed with Exception: %s", e)
         return {
             "authenticated": False,
             "error": "Failed to check authentication status"
         }
 
 
+def _remove_global_credentials():
+    """Remove legacy global credential files, ignoring ones that don't exist."""
+    for file_path in ("gmail_credentials.json", "gmail_token.json"):
+        try:
+            os.unlink(file_path)
+        except FileNotFoundError:
+            pass
+
+
 @router.post("/gmail/logout")
 async def gmail_logout(request: Request) -> Dict[str, str]:
     """
@@ -161,18 +212,18 @@ async def gmail_logout(request: Request) -> Dict[str, str]:
         Logout confirmation
     """
     try:
-        session_id = getattr(request.state, 'session_id', None)
+        session_id = request.state.ctx.session_id
+        gmail_pool.invalidate(session_id)
+        # The pool's eviction listener only fires if it held a Gmail service for this session
+        ai_service_pool.invalidate(session_id)
         
+        # File deletion is blocking I/O, so keep it off the event loop
         if session_id:
             # Delete the session and its associated credentials
-            session_manager.delete_session(session_id)
+            await asyncio.to_thread(session_manager.delete_session, session_id)
         else:
             # Fallback: clear global credential files for backward compatibility
-            import os
-            files_to_remove = ["gmail_credentials.json", "gmail_token.json"]
-            for file_path in files_to_remove:
-                if os.path.exists(file_path):
-                    os.remove(file_path)
+            await asyncio.to_thread(_remove_global_credentials)
         
         return {"message": "Successfully logged out from Gmail"}
     except Exception as e:
@@ -187,10 +238,4 @@ async def auth_health_check():
     Returns:
         Service health status
     """
-    return JSONResponse(
-        content={
-            "status": "healthy",
-            "service": "auth-service",
-            "version": "1.0.0"
-        }
-    ) 
\ No newline at end of file
+    return Response(content=_HEALTH_BODY, media_type="application/json") 
\ No newline at end of file
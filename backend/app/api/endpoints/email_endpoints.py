@@ -2,39 +2,37 @@
 Email-related API endpoints.
 Follows Single Responsibility Principle - handles only email API operations.
 """
-from typing import List
-from fastapi import APIRouter, HTTPException, Depends, Request
-from fastapi.responses import JSONResponse
+from typing import Any, Callable, List
+import orjson
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
+from fastapi.responses import ORJSONResponse
 
 from app.models.email_models import (
-    EmailDomain, EmailContent, EmailSummary, ResponseRequest, ResponseGeneration
+    EmailDomain, EmailContent, EmailSummary, ResponseRequest, ResponseGeneration,
+    SendReplyRequest
 )
 from app.services.email_service import EmailService
 from app.services.ai_service import AIService
-from app.services.gmail_service import GmailService
+from app.api.dependencies import get_email_service, get_session_ai_service
+from app.core.gmail_pool import run_gmail
 from app.core.exceptions import (
     EmailProcessingException, InvalidEmailDomainException, AIServiceException
 )
 
 
-router = APIRouter(tags=["emails"])
+router = APIRouter(tags=["emails"], default_response_class=ORJSONResponse)
 
+# Health check payload never changes, so serialize it once
+_HEALTH_BODY = orjson.dumps({
+    "status": "healthy",
+    "service": "email-ai-backend",
+    "version": "1.0.0"
+})
 
-def get_email_service(request: Request) -> EmailService:
-    """Dependency injection for email service with session support."""
-    session_id = getattr(request.state, 'session_id', None)
-    return EmailService(session_id=session_id)
 
-
-def get_gmail_service(request: Request) -> GmailService:
-    """Dependency injection for Gmail service with session support."""
-    session_id = getattr(request.state, 'session_id', None)
-    return GmailService(session_id=session_id)
-
-
-def get_ai_service(request: Request, gmail_service: GmailService = Depends(get_gmail_service)) -> AIService:
-    """Dependency injection for AI service with Gmail service dependency."""
-    return AIService(gmail_service)
+async def _run_gmail(email_service: EmailService, method: Callable[..., Any], *args: Any) -> Any:
+    """Run a blocking Gmail-backed email service call off the event loop."""
+    return await run_gmail(email_service.gmail_service, method, *args)
 
 
 @router.get("/domains", response_model=List[EmailDomain])
@@ -49,12 +47,10 @@ async def get_email_domains(
         List of email domains sorted by importance
     """
     try:
-        domains = email_service.get_all_domains()
+        domains = await _run_gmail(email_service, email_service.get_all_domains)
         return domains
     except EmailProcessingException as e:
         raise HTTPException(status_code=500, detail=f"Failed to get domains: {str(e)}")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail="Internal server error")
 
 
 @router.get("/domains/{domain}/emails", response_model=List[EmailContent])
@@ -78,19 +74,17 @@ async def get_emails_by_domain(
         if limit > 100:  # Prevent excessive requests
             limit = 100
         
-        emails = email_service.get_emails_by_domain(domain, limit)
+        emails = await _run_gmail(email_service, email_service.get_emails_by_domain, domain, limit)
         return emails
     except EmailProcessingException as e:
         raise HTTPException(status_code=500, detail=f"Failed to get emails: {str(e)}")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail="Internal server error")
 
 
 @router.post("/summarize", response_model=EmailSummary)
 async def summarize_email(
     request: Request,
     email: EmailContent,
-    ai_service: AIService = Depends(get_ai_service)
+    ai_service: AIService = Depends(get_session_ai_service)
 ) -> EmailSummary:
     """
     Generate AI summary for an email.
@@ -106,15 +100,13 @@ async def summarize_email(
         return summary
     except AIServiceException as e:
         raise HTTPException(status_code=500, detail=f"AI summarization failed: {str(e)}")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail="Internal server error")
 
 
 @router.post("/generate-response", response_model=ResponseGeneration)
 async def generate_email_response(
     request: Request,
     response_request: ResponseRequest,
-    ai_service: AIService = Depends(get_ai_service)
+    ai_service: AIService = Depends(get_session_ai_service)
 ) -> ResponseGeneration:
     """
     Generate AI-powered email response.
@@ -130,33 +122,32 @@ async def generate_email_response(
         return response
     except AIServiceException as e:
         raise HTTPException(status_code=500, detail=f"Response generation failed: {str(e)}")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail="Internal server error")
 
 
 @router.post("/send-reply")
 async def send_email_reply(
     request: Request,
-    reply_request: dict,
+    reply_request: SendReplyRequest,
     email_service: EmailService = Depends(get_email_service)
 ) -> dict:
     """
     Send a reply to an email.
     
     Args:
-        request: Dict containing original_email and reply_body
+        reply_request: Original email and reply body
     
     Returns:
         Success confirmation
     """
     try:
-        original_email = EmailContent(**reply_request.get('original_email'))
-        reply_body = reply_request.get('reply_body', '')
+        reply_body = reply_request.reply_body
         
         if not reply_body.strip():
             raise HTTPException(status_code=400, detail="Reply body cannot be empty")
         
-        success = email_service.send_reply(original_email, reply_body)
+        success = await _run_gmail(
+            email_service, email_service.send_reply, reply_request.original_email, reply_body
+        )
         
         if success:
             return {"message": "Reply sent successfully"}
@@ -165,8 +156,6 @@ async def send_email_reply(
             
     except EmailProcessingException as e:
         raise HTTPException(status_code=500, detail=f"Failed to send reply: {str(e)}")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail="Internal server error")
 
 
 @router.get("/message/{message_id}", response_model=EmailContent)
@@ -185,12 +174,10 @@ async def get_full_email(
         Full email content with body
     """
     try:
-        email = email_service.get_email_by_id(message_id)
+        email = await _run_gmail(email_service, email_service.get_email_by_id, message_id)
         return email
     except EmailProcessingException as e:
         raise HTTPException(status_code=500, detail=f"Failed to get email: {str(e)}")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail="Internal server error")
 
 
 @router.get("/health")
@@ -201,10 +188,4 @@ async def health_check():
     Returns:
         Service health status
     """
-    return JSONResponse(
-        content={
-            "status": "healthy",
-            "service": "email-ai-backend",
-            "version": "1.0.0"
-        }
-    ) 
\ No newline at end of file
+    return Response(content=_HEALTH_BODY, media_type="application/json") 
\ No newline at end of file
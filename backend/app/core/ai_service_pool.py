@@ -0,0 +1,96 @@
+"""
+Pool of per-session AI service instances.
+Bounds the session-scoped AI services (and their summary caches) and evicts idle ones.
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from app.services.ai_service import AIService
+
+logger = logging.getLogger(__name__)
+
+
+class AIServicePool:
+    """Bounded LRU pool of AIService instances keyed by session ID."""
+
+    def __init__(self, max_size: int = 256, idle_timeout: float = 30 * 60):
+        """Initialize an empty pool."""
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self._entries: "OrderedDict[Optional[str], tuple[AIService, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, session_id: Optional[str]) -> Optional[AIService]:
+        """Return the pooled AI service for a session without counting it as a use."""
+        entry = self._entries.get(session_id)
+        return entry[0] if entry is not None else None
+
+    def get_or_create(self, session_id: Optional[str]) -> AIService:
+        """Return the pooled AI service for a session, creating it on first use."""
+        with self._lock:
+            entry = self._entries.get(session_id)
+            service = entry[0] if entry is not None else AIService(session_id=session_id)
+            self._entries[session_id] = (service, time.monotonic())
+            self._entries.move_to_end(session_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            return service
+
+    def invalidate(self, session_id: Optional[str]):
+        """Remove a session's AI service from the pool (e.g. on logout)."""
+        with self._lock:
+            self._entries.pop(session_id, None)
+
+    def evict_idle(self) -> int:
+        """Evict entries unused for longer than the idle timeout."""
+        cutoff = time.monotonic() - self.idle_timeout
+        evicted = 0
+        with self._lock:
+            # Entries are kept in least-recently-used order
+            while self._entries:
+                _, (_, last_used) = next(iter(self._entries.items()))
+                if last_used > cutoff:
+                    break
+                self._entries.popitem(last=False)
+                evicted += 1
+
+        if evicted:
+            logger.info("🧹 Evicted %s idle AI services from pool", evicted)
+        return evicted
+
+    def cleanup_summary_caches(self, *extra_services: Optional[AIService]) -> int:
+        """Drop expired summaries from every pooled service plus any given ones."""
+        with self._lock:
+            services = [service for service, _ in self._entries.values()]
+        services.extend(service for service in extra_services if service is not None)
+        removed = sum(service.cleanup_summary_cache() for service in services)
+        if removed:
+            logger.info("🧹 Dropped %s expired summaries from %s caches", removed, len(services))
+        return removed
+
+    async def run_idle_eviction(self, interval: float = 60, shared_service: Optional[AIService] = None):
+        """Periodically evict idle entries and expired summaries until cancelled."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self.evict_idle()
+                # Lookups only expire the exact digest they hit, so sweep the rest here
+                self.cleanup_summary_caches(shared_service)
+            except Exception as e:
+                logger.error("Failed to evict idle AI services: %s", e)
+
+    def clear(self):
+        """Remove every pooled service."""
+        with self._lock:
+            self._entries.clear()
+
+
+# Global AI service pool instance
+ai_service_pool = AIServicePool()
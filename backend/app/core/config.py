@@ -2,11 +2,14 @@
 Configuration management for the email AI application.
 Follows Single Responsibility Principle - handles only configuration.
 """
-import os
-from typing import Optional
-from pydantic import validator
+import logging
+from functools import lru_cache
+from typing import Optional, Tuple
+from pydantic import PrivateAttr, model_validator
 from pydantic_settings import BaseSettings
 
+logger = logging.getLogger(__name__)
+
 
 class Settings(BaseSettings):
     """Application settings with validation."""
@@ -18,11 +21,11 @@ class Settings(BaseSettings):
     gmail_client_id: Optional[str] = None
     gmail_client_secret: Optional[str] = None
     gmail_redirect_uri: str = "http://localhost:8000/auth/gmail/callback"
-    gmail_scopes: list = [
+    gmail_scopes: Tuple[str, ...] = (
         "https://www.googleapis.com/auth/gmail.readonly",
         "https://www.googleapis.com/auth/gmail.send",
         "https://www.googleapis.com/auth/gmail.compose"
-    ]
+    )
     
 
     
@@ -34,32 +37,41 @@ class Settings(BaseSettings):
     # AI Service Configuration
     max_email_length: int = 10000
     max_response_length: int = 2000
+    claude_concurrency: int = 10  # concurrent Claude requests per process
     
     # Gmail API Performance Settings
     gmail_request_timeout: int = 30  # seconds
     gmail_max_emails_per_request: int = 30  # reduced for better performance
+    gmail_list_cache_ttl: float = 60  # seconds an email/domain listing is reused
     
     # CORS Settings
     allowed_origins: str = "http://localhost:3000,http://127.0.0.1:3000,http://localhost:3030,http://127.0.0.1:3030,http://frontend:3000"
     
+    _cors_origins: Tuple[str, ...] = PrivateAttr(default=())
+    
     @property
-    def cors_origins(self) -> list:
-        """Parse CORS origins from string to list."""
-        if isinstance(self.allowed_origins, str):
-            return [origin.strip() for origin in self.allowed_origins.split(",")]
-        return self.allowed_origins
+    def cors_origins(self) -> Tuple[str, ...]:
+        """CORS origins parsed from the comma-separated setting."""
+        return self._cors_origins
     
     class Config:
         env_file = ".env"
         case_sensitive = False
     
-    @validator('claude_api_key')
-    def validate_claude_api_key(cls, v):
-        if not v:
-            print("Warning: Claude API key not set. AI features will not work.")
-        return v
+    @model_validator(mode="after")
+    def parse_cors_origins(self):
+        """Parse CORS origins once at load time."""
+        if isinstance(self.allowed_origins, str):
+            self._cors_origins = tuple(origin.strip() for origin in self.allowed_origins.split(","))
+        else:
+            self._cors_origins = tuple(self.allowed_origins)
+        return self
 
 
+@lru_cache(maxsize=1)
 def get_settings() -> Settings:
-    """Get application settings instance."""
-    return Settings()
+    """Get the cached application settings instance."""
+    settings = Settings()
+    if not settings.claude_api_key:
+        logger.warning("Claude API key not set. AI features will not work.")
+    return settings
@@ -0,0 +1,146 @@
+"""
+Pool of per-session Gmail service instances.
+Keeps authenticated Gmail clients alive across requests and evicts idle ones.
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, List, Optional
+
+import requests
+from google.auth.transport.requests import Request
+
+from app.services.gmail_service import GmailService
+
+logger = logging.getLogger(__name__)
+
+
+class GmailServicePool:
+    """Bounded LRU pool of GmailService instances keyed by session ID."""
+
+    def __init__(self, max_size: int = 256, idle_timeout: float = 30 * 60, max_connections: int = 100):
+        """Initialize an empty pool."""
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.max_connections = max_connections
+        self._entries: "OrderedDict[Optional[str], tuple[GmailService, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._eviction_listeners: List[Callable[[Optional[str]], None]] = []
+        self._http_session: Optional[requests.Session] = None
+        self._auth_request: Optional[Request] = None
+    
+    def _get_auth_request(self) -> Request:
+        """Shared token-refresh transport, so TLS connections to Google are reused across sessions."""
+        with self._lock:
+            if self._auth_request is None:
+                self._http_session = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(pool_maxsize=self.max_connections)
+                self._http_session.mount("https://", adapter)
+                self._auth_request = Request(session=self._http_session)
+            return self._auth_request
+
+    def add_eviction_listener(self, listener: Callable[[Optional[str]], None]):
+        """Register a callback invoked with the session ID of every evicted entry."""
+        self._eviction_listeners.append(listener)
+
+    def get_or_create(self, session_id: Optional[str]) -> GmailService:
+        """Return the pooled Gmail service for a session, creating it on first use."""
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is not None:
+                self._entries[session_id] = (entry[0], time.monotonic())
+                self._entries.move_to_end(session_id)
+                return entry[0]
+
+        # Build outside the lock: loading credentials may refresh tokens over the network
+        service = GmailService(session_id=session_id, auth_request=self._get_auth_request())
+
+        evicted = []
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is not None:
+                # Another request created it concurrently; keep the first one
+                self._entries.move_to_end(session_id)
+                return entry[0]
+
+            self._entries[session_id] = (service, time.monotonic())
+            while len(self._entries) > self.max_size:
+                evicted.append(self._entries.popitem(last=False))
+
+        for evicted_id, (evicted_service, _) in evicted:
+            self._close(evicted_id, evicted_service)
+        return service
+
+    async def aget_or_create(self, session_id: Optional[str]) -> GmailService:
+        """get_or_create from the event loop; creation loads and may refresh tokens, so it runs on a thread."""
+        return await asyncio.to_thread(self.get_or_create, session_id)
+
+    def invalidate(self, session_id: Optional[str]):
+        """Remove a session's Gmail service from the pool (e.g. on logout)."""
+        with self._lock:
+            entry = self._entries.pop(session_id, None)
+        if entry is not None:
+            self._close(session_id, entry[0])
+
+    def evict_idle(self) -> int:
+        """Evict entries unused for longer than the idle timeout."""
+        cutoff = time.monotonic() - self.idle_timeout
+        evicted = []
+        with self._lock:
+            # Entries are kept in least-recently-used order
+            while self._entries:
+                session_id, (service, last_used) = next(iter(self._entries.items()))
+                if last_used > cutoff:
+                    break
+                self._entries.popitem(last=False)
+                evicted.append((session_id, service))
+
+        for session_id, service in evicted:
+            self._close(session_id, service)
+        if evicted:
+            logger.info("🧹 Evicted %s idle Gmail services from pool", len(evicted))
+        return len(evicted)
+
+    async def run_idle_eviction(self, interval: float = 60):
+        """Periodically evict idle entries until cancelled."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self.evict_idle()
+            except Exception as e:
+                logger.error("Failed to evict idle Gmail services: %s", e)
+
+    def clear(self):
+        """Close and remove every pooled service and the shared HTTP session."""
+        with self._lock:
+            entries = list(self._entries.items())
+            self._entries.clear()
+            http_session, self._http_session, self._auth_request = self._http_session, None, None
+        for session_id, (service, _) in entries:
+            self._close(session_id, service)
+        if http_session is not None:
+            http_session.close()
+
+    def _close(self, session_id: Optional[str], service: GmailService):
+        """Close an evicted service and notify listeners."""
+        try:
+            service.close()
+        except Exception as e:
+            logger.warning("Could not close Gmail service for session %s: %s", session_id, e)
+        for listener in self._eviction_listeners:
+            listener(session_id)
+
+
+async def run_gmail(gmail_service: GmailService, method: Callable[..., Any], *args: Any) -> Any:
+    """Run a blocking Gmail-backed call on a worker thread, one at a time per service."""
+    def call():
+        # Pooled services are shared across requests and httplib2 is not thread-safe
+        with gmail_service.lock:
+            return method(*args)
+    return await asyncio.to_thread(call)
+
+
+# Global Gmail service pool instance
+gmail_pool = GmailServicePool()
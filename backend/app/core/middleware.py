@@ -0,0 +1,111 @@
+"""
+HTTP middleware for session resolution and request logging.
+Follows Single Responsibility Principle - handles only per-request plumbing.
+"""
+import asyncio
+import logging
+import time
+
+from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import ASGIApp
+
+from app.core.session_manager import session_manager
+from app.core.request_context import RequestCtx
+
+logger = logging.getLogger(__name__)
+
+_CALLBACK_PATH = "/auth/gmail/callback"
+
+# Endpoints that never read the session; resolving one there would only
+# create and persist throwaway sessions (e.g. for container health checks)
+_SESSIONLESS_PATHS = frozenset({
+    "/",
+    "/auth/health",
+    "/api/emails/health",
+    "/api/ai/health",
+    "/api/ai/provider",
+    "/docs",
+    "/redoc",
+    "/openapi.json",
+})
+
+
+class SessionAndLoggingMiddleware(BaseHTTPMiddleware):
+    """Resolves the request's session and logs the request in a single middleware pass."""
+    
+    def __init__(self, app: ASGIApp, log_requests: bool = True):
+        """Initialize middleware; request logging can be left to the server's access log."""
+        super().__init__(app)
+        self.log_requests = log_requests
+    
+    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
+        if self.log_requests:
+            start_time = time.time()
+            logger.info("📥 %s %s - Client: %s", request.method, request.url.path, request.client.host)
+        
+        path = request.url.path
+        if path in _SESSIONLESS_PATHS:
+            request.state.ctx = RequestCtx()
+            response = await call_next(request)
+            if self.log_requests:
+                self._log_response(request, response, start_time)
+            return response
+        
+        # Get tab ID from header (sent by frontend)
+        tab_id = request.headers.get("X-Tab-ID")
+        
+        # Special handling for OAuth callback - use state parameter to find session
+        if path == _CALLBACK_PATH:
+            state = request.query_params.get("state")
+            if state and state != "no_session" and await session_manager.is_valid_session_async(state):
+                session_id = state
+                logger.info("🔗 OAuth callback using session from state: %s", session_id)
+            else:
+                # Fallback for callback without valid state; creation writes through
+                # to SQLite, so it runs off the event loop
+                session_id = await asyncio.to_thread(session_manager.create_session)
+                logger.warning("⚠️ OAuth callback with invalid state, created new session: %s", session_id)
+        elif tab_id:
+            # Regular tab-specific session handling
+            session_id = tab_id
+            if not await session_manager.is_valid_session_async(session_id):
+                await asyncio.to_thread(session_manager.create_session_with_id, session_id)
+                logger.info("🆕 Created new tab session: %s", session_id)
+            else:
+                logger.debug("🔄 Using existing tab session: %s", session_id)
+        else:
+            # Fallback: use cookie-based session
+            session_id = request.cookies.get("session_id")
+            if not session_id or not await session_manager.is_valid_session_async(session_id):
+                session_id = await asyncio.to_thread(session_manager.create_session)
+                logger.info("🆕 Created new cookie session: %s", session_id)
+            else:
+                logger.debug("🔄 Using existing cookie session: %s", session_id)
+        
+        request.state.ctx = RequestCtx(session_id=session_id)
+        response = await call_next(request)
+        
+        # Set session cookie for non-tab-based requests, unless the client already holds it
+        if (not tab_id and path != _CALLBACK_PATH
+                and request.cookies.get("session_id") != session_id):
+            response.set_cookie(
+                key="session_id",
+                value=session_id,
+                httponly=False,  # Allow JavaScript access
+                secure=False,  # Set to True in production with HTTPS
+                samesite="lax",
+                max_age=None  # Session cookie - expires when browser closes
+            )
+        
+        if self.log_requests:
+            self._log_response(request, response, start_time)
+        
+        return response
+    
+    @staticmethod
+    def _log_response(request: Request, response: Response, start_time: float):
+        """Log the outcome and duration of a request."""
+        process_time = time.time() - start_time
+        logger.info("📤 %s %s - Status: %s - Time: %.3fs", request.method, request.url.path, response.status_code, process_time)
@@ -0,0 +1,12 @@
+"""
+Per-request context attached by the session middleware.
+Follows Single Responsibility Principle - holds only request-scoped state.
+"""
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass(slots=True)
+class RequestCtx:
+    """Typed, slot-backed request state stored on ``request.state.ctx``."""
+    session_id: Optional[str] = None
@@ -1,13 +1,17 @@
 """
 Session management for handling multiple user sessions.
 """
+import asyncio
+import atexit
 import os
-import json
 import logging
 import secrets
-import uuid
-from datetime import datetime, timedelta
-from typing import Dict, Any, Optional
+import sqlite3
+import threading
+import time
+import orjson
+from datetime import timedelta
+from typing import Dict, Any, Optional, Set
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
@@ -20,6 +24,28 @@ class SessionManager:
         self.sessions_dir = Path("user_sessions")
         self.sessions_dir.mkdir(exist_ok=True)
         self.session_timeout = timedelta(hours=24)  # Sessions expire after 24 hours
+        self._timeout_seconds = self.session_timeout.total_seconds()
+        # Cache of deserialized sessions; creates and deletes write through,
+        # updates are marked dirty and flushed to the store in batches
+        self._cache: Dict[str, Dict[str, Any]] = {}
+        self._dirty: Set[str] = set()
+        # Guards the cache, the dirty set and the shared SQLite connection
+        self._lock = threading.RLock()
+        self._db = self._open_database(self.sessions_dir / "sessions.db")
+        atexit.register(self.flush_dirty_sessions)
+    
+    @staticmethod
+    def _open_database(db_path: Path) -> sqlite3.Connection:
+        """Open the session store and make sure its schema exists."""
+        db = sqlite3.connect(str(db_path), check_same_thread=False, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "session_id TEXT PRIMARY KEY, data BLOB NOT NULL, expires_at REAL NOT NULL)"
+        )
+        db.execute("CREATE INDEX IF NOT EXISTS idx_sessions_expires_at ON sessions(expires_at)")
+        return db
     
     def create_session(self) -> str:
         """Create a new session and return session ID."""
@@ -28,106 +54,178 @@ class SessionManager:
     
     def create_session_with_id(self, session_id: str) -> str:
         """Create a session with a specific ID."""
+        now = time.time()
         session_data = {
             "session_id": session_id,
-            "created_at": datetime.now().isoformat(),
-            "expires_at": (datetime.now() + self.session_timeout).isoformat(),
+            "created_at": now,  # Epoch seconds
+            "expires_at": now + self._timeout_seconds,
             "is_active": True,
             "user_email": None  # Will be set during authentication
         }
         
-        session_file = self.sessions_dir / f"{session_id}.json"
-        with open(session_file, 'w') as f:
-            json.dump(session_data, f, indent=2)
+        with self._lock:
+            self._persist_session(session_id, session_data)
+            self._cache[session_id] = session_data
         
-        logger.info(f"🆕 Created new session: {session_id}")
+        logger.info("🆕 Created new session: %s", session_id)
         return session_id
     
-    def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
-        """Get session data by session ID."""
-        session_file = self.sessions_dir / f"{session_id}.json"
+    def _persist_session(self, session_id: str, session_data: Dict[str, Any]):
+        """Write session data to the session store. Caller must hold the lock."""
+        self._db.execute(
+            "INSERT OR REPLACE INTO sessions (session_id, data, expires_at) VALUES (?, ?, ?)",
+            (session_id, orjson.dumps(session_data), session_data['expires_at'])
+        )
+    
+    def _load_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Return the live cached session dict, reading it from the store on a cache miss."""
+        with self._lock:
+            session_data = self._cache.get(session_id)
+            
+            if session_data is None:
+                try:
+                    row = self._db.execute(
+                        "SELECT data FROM sessions WHERE session_id = ?", (session_id,)
+                    ).fetchone()
+                    if row is None:
+                        return None
+                    session_data = orjson.loads(row[0])
+                except Exception as e:
+                    logger.error("Failed to load session %s: %s", session_id, e)
+                    return None
+                
+                self._cache[session_id] = session_data
         
-        if not session_file.exists():
+        # Check if session is expired
+        if time.time() > session_data['expires_at']:
+            self.delete_session(session_id)
             return None
         
-        try:
-            with open(session_file, 'r') as f:
-                session_data = json.load(f)
-            
-            # Check if session is expired
-            expires_at = datetime.fromisoformat(session_data['expires_at'])
-            if datetime.now() > expires_at:
-                self.delete_session(session_id)
-                return None
-            
-            return session_data
-            
-        except Exception as e:
-            logger.error(f"Failed to load session {session_id}: {e}")
-            return None
+        return session_data
+    
+    def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Get session data by session ID."""
+        session_data = self._load_session(session_id)
+        # Hand out a copy so callers can't mutate the cached entry
+        return dict(session_data) if session_data is not None else None
     
     def update_session(self, session_id: str, updates: Dict[str, Any]) -> bool:
-        """Update session data."""
-        session_data = self.get_session(session_id)
-        if not session_data:
-            return False
-        
-        session_data.update(updates)
-        session_file = self.sessions_dir / f"{session_id}.json"
-        
-        try:
-            with open(session_file, 'w') as f:
-                json.dump(session_data, f, indent=2)
-            return True
-        except Exception as e:
-            logger.error(f"Failed to update session {session_id}: {e}")
-            return False
+        """Update session data; the change is persisted by the next dirty-session flush."""
+        # One critical section, so a concurrent delete can't be undone by re-caching the entry
+        with self._lock:
+            if self._load_session(session_id) is None:
+                return False
+            session_data = self._cache.get(session_id)
+            if session_data is None:
+                return False
+            self._cache[session_id] = {**session_data, **updates}
+            self._dirty.add(session_id)
+        return True
+    
+    def flush_dirty_sessions(self) -> int:
+        """Persist every session updated since the last flush in one transaction."""
+        with self._lock:
+            if not self._dirty:
+                return 0
+            dirty_ids, self._dirty = self._dirty, set()
+            rows = [
+                (session_id, orjson.dumps(session_data), session_data['expires_at'])
+                for session_id in dirty_ids
+                if (session_data := self._cache.get(session_id)) is not None
+            ]
+            try:
+                self._db.execute("BEGIN")
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO sessions (session_id, data, expires_at) VALUES (?, ?, ?)",
+                    rows
+                )
+                self._db.execute("COMMIT")
+            except Exception as e:
+                if self._db.in_transaction:
+                    self._db.execute("ROLLBACK")
+                # Keep the sessions dirty so the next flush retries them
+                self._dirty |= dirty_ids
+                logger.error("Failed to flush %s dirty sessions: %s", len(dirty_ids), e)
+                return 0
+        return len(rows)
+    
+    async def run_periodic_flush(self, interval: float = 5):
+        """Periodically flush dirty sessions off the event loop until cancelled."""
+        while True:
+            await asyncio.sleep(interval)
+            await asyncio.to_thread(self.flush_dirty_sessions)
     
     def delete_session(self, session_id: str) -> bool:
         """Delete a session and its associated data."""
         try:
-            # Remove session file
-            session_file = self.sessions_dir / f"{session_id}.json"
-            if session_file.exists():
-                session_file.unlink()
+            with self._lock:
+                self._cache.pop(session_id, None)
+                self._dirty.discard(session_id)
+                self._db.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
             
             # Remove associated credential files
             self._clear_session_credentials(session_id)
             
-            logger.info(f"🗑️ Deleted session: {session_id}")
+            logger.info("🗑️ Deleted session: %s", session_id)
             return True
             
         except Exception as e:
-            logger.error(f"Failed to delete session {session_id}: {e}")
+            logger.error("Failed to delete session %s: %s", session_id, e)
             return False
     
     def _clear_session_credentials(self, session_id: str):
         """Clear Gmail credentials for a specific session."""
-        try:
-            credentials_file = f"gmail_credentials_{session_id}.json"
-            token_file = f"gmail_token_{session_id}.json"
-            
-            for file_path in [credentials_file, token_file]:
-                if os.path.exists(file_path):
-                    os.remove(file_path)
-                    logger.debug(f"Removed credential file: {file_path}")
-        except Exception as e:
-            logger.warning(f"Could not clear credentials for session {session_id}: {e}")
+        credentials_file = f"gmail_credentials_{session_id}.json"
+        token_file = f"gmail_token_{session_id}.json"
+        
+        for file_path in (credentials_file, token_file):
+            try:
+                os.unlink(file_path)
+                logger.debug("Removed credential file: %s", file_path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning("Could not clear credentials for session %s: %s", session_id, e)
     
     def cleanup_expired_sessions(self):
         """Clean up expired sessions."""
         try:
-            for session_file in self.sessions_dir.glob("*.json"):
-                session_id = session_file.stem
-                session_data = self.get_session(session_id)
-                if not session_data:  # Will be None if expired
-                    logger.info(f"🧹 Cleaned up expired session: {session_id}")
+            # Indexed range scan; every session is persisted on creation, so this covers cached ones too
+            with self._lock:
+                rows = self._db.execute(
+                    "SELECT session_id FROM sessions WHERE expires_at < ?", (time.time(),)
+                ).fetchall()
+            for (session_id,) in rows:
+                self.delete_session(session_id)
+                logger.info("🧹 Cleaned up expired session: %s", session_id)
         except Exception as e:
-            logger.error(f"Failed to cleanup expired sessions: {e}")
+            logger.error("Failed to cleanup expired sessions: %s", e)
+    
+    async def run_periodic_cleanup(self, interval: float = 60 * 60):
+        """Periodically clean up expired sessions off the event loop until cancelled."""
+        while True:
+            await asyncio.sleep(interval)
+            await asyncio.to_thread(self.cleanup_expired_sessions)
+    
+    def clear_all_sessions(self) -> int:
+        """Remove every stored session and return how many were removed."""
+        with self._lock:
+            self._cache.clear()
+            self._dirty.clear()
+            return self._db.execute("DELETE FROM sessions").rowcount
     
     def is_valid_session(self, session_id: str) -> bool:
         """Check if session ID is valid and not expired."""
-        return self.get_session(session_id) is not None
+        return self._load_session(session_id) is not None
+    
+    async def is_valid_session_async(self, session_id: str) -> bool:
+        """Check a session from the event loop, moving store reads to a worker thread."""
+        # A plain dict read is atomic, so the cache hit path doesn't need the
+        # lock, which a worker thread may be holding across a database query
+        session_data = self._cache.get(session_id)
+        if session_data is not None and time.time() <= session_data['expires_at']:
+            return True
+        return await asyncio.to_thread(self.is_valid_session, session_id)
 
 
 # Global session manager instance
@@ -0,0 +1,149 @@
+"""
+Cache of AI email summaries.
+Reuses summaries for repeated and near-duplicate emails (newsletters, notifications)
+so they don't each cost a Claude round-trip.
+"""
+import hashlib
+import logging
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, NamedTuple, Optional, Tuple
+
+from app.core.exceptions import InvalidEmailDomainException
+from app.models.email_models import EmailContent, EmailSummary
+from app.services.gmail_service import extract_sender_domain
+
+logger = logging.getLogger(__name__)
+
+_PUNCTUATION_RE = re.compile(r'[^\w\s]+')
+_WHITESPACE_RE = re.compile(r'\s+')
+_NUMBER_RE = re.compile(r'\d+')
+
+
+class SummaryCacheKey(NamedTuple):
+    """Exact digest plus the data needed for near-duplicate matching."""
+    digest: str
+    sender_domain: str
+    shingles: FrozenSet[int]
+    numbers: Tuple[str, ...]
+
+
+class SummaryCache:
+    """Bounded LRU of summaries with an exact lookup and an opt-in near-duplicate fallback."""
+
+    def __init__(
+        self,
+        namespace: str,
+        max_size: int = 1000,
+        ttl_seconds: float = 24 * 3600,
+        normalized_length: int = 4000,
+        similarity_threshold: Optional[float] = None,
+        fuzzy_scan_limit: int = 50,
+        shingle_size: int = 3
+    ):
+        """Initialize an empty cache; namespace separates models and providers."""
+        self.namespace = namespace
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.normalized_length = normalized_length
+        # None disables near-duplicate reuse: templated mail (codes, orders, invoices)
+        # looks alike but must not be shown another email's summary
+        self.similarity_threshold = similarity_threshold
+        self.fuzzy_scan_limit = fuzzy_scan_limit
+        self.shingle_size = shingle_size
+        self._entries: "OrderedDict[str, Tuple[SummaryCacheKey, EmailSummary, float]]" = OrderedDict()
+        self._hits = 0
+        self._fuzzy_hits = 0
+        self._misses = 0
+
+    def normalize(self, text: str) -> str:
+        """Lowercase, drop punctuation and collapse whitespace."""
+        text = _PUNCTUATION_RE.sub(' ', text.lower())
+        return _WHITESPACE_RE.sub(' ', text).strip()
+
+    def make_key(self, email: EmailContent) -> SummaryCacheKey:
+        """Build the cache key for an email from its subject, sender domain and body."""
+        try:
+            sender_domain = extract_sender_domain(str(email.sender))
+        except InvalidEmailDomainException:
+            # No usable domain: keep the raw sender so unrelated senders don't share a bucket
+            sender_domain = str(email.sender).strip().lower()
+        normalized = f"{self.normalize(email.subject)}\n{self.normalize(email.body)}"
+        # The digest covers the whole text, so an exact hit is always the same email content
+        digest = hashlib.sha256(f"{self.namespace}:{sender_domain}:{normalized}".encode()).hexdigest()
+        if self.similarity_threshold is None:
+            return SummaryCacheKey(digest, sender_domain, frozenset(), ())
+
+        words = normalized[:self.normalized_length].split()
+        shingles = frozenset(
+            hash(tuple(words[index:index + self.shingle_size]))
+            for index in range(max(1, len(words) - self.shingle_size + 1))
+        )
+        return SummaryCacheKey(digest, sender_domain, shingles, tuple(_NUMBER_RE.findall(normalized)))
+
+    def get(self, key: SummaryCacheKey) -> Optional[EmailSummary]:
+        """Return a cached summary for this key, or for a close enough recent email."""
+        now = time.monotonic()
+        entry = self._entries.get(key.digest)
+        if entry is not None:
+            if now - entry[2] <= self.ttl_seconds:
+                self._entries.move_to_end(key.digest)
+                self._hits += 1
+                return entry[1]
+            del self._entries[key.digest]
+
+        if self.similarity_threshold is None:
+            self._misses += 1
+            return None
+
+        # Near-duplicates: only the most recent emails from the same sender domain, and
+        # never when any number differs (codes, amounts, dates, order IDs)
+        for scanned, (digest, (cached_key, summary, stored_at)) in enumerate(reversed(self._entries.items())):
+            if scanned >= self.fuzzy_scan_limit:
+                break
+            if cached_key.sender_domain != key.sender_domain or now - stored_at > self.ttl_seconds:
+                continue
+            if cached_key.numbers != key.numbers:
+                continue
+            if self._jaccard(cached_key.shingles, key.shingles) >= self.similarity_threshold:
+                self._entries.move_to_end(digest)
+                self._fuzzy_hits += 1
+                logger.debug("♻️ Near-duplicate summary cache hit for %s", key.sender_domain)
+                return summary
+
+        self._misses += 1
+        return None
+
+    def put(self, key: SummaryCacheKey, summary: EmailSummary):
+        """Store a summary, evicting the least recently used one when full."""
+        self._entries[key.digest] = (key, summary, time.monotonic())
+        self._entries.move_to_end(key.digest)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def cleanup(self) -> int:
+        """Drop expired summaries and return how many were removed."""
+        now = time.monotonic()
+        expired = [digest for digest, (_, _, stored_at) in self._entries.items() if now - stored_at > self.ttl_seconds]
+        for digest in expired:
+            del self._entries[digest]
+        return len(expired)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and size, for monitoring."""
+        lookups = self._hits + self._fuzzy_hits + self._misses
+        return {
+            "size": len(self._entries),
+            "hits": self._hits,
+            "fuzzy_hits": self._fuzzy_hits,
+            "misses": self._misses,
+            "hit_rate": (self._hits + self._fuzzy_hits) / lookups if lookups else 0.0
+        }
+
+    @staticmethod
+    def _jaccard(first: FrozenSet[int], second: FrozenSet[int]) -> float:
+        """Jaccard similarity of two shingle sets."""
+        if not first or not second:
+            return 0.0
+        return len(first & second) / len(first | second)
@@ -2,26 +2,40 @@
 Main FastAPI application entry point.
 Follows Single Responsibility Principle - handles only application setup.
 """
+import asyncio
+import atexit
 import logging
 import os
 import sys
-from fastapi import FastAPI, Request, Response
+from contextlib import asynccontextmanager
+from logging.handlers import QueueHandler, QueueListener
+from queue import SimpleQueue
+import uvicorn
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-import time
+from fastapi.responses import ORJSONResponse
 
 from app.core.config import get_settings
 from app.core.exceptions import EmailAIException
 from app.core.session_manager import session_manager
+from app.core.middleware import SessionAndLoggingMiddleware
+from app.core.gmail_pool import gmail_pool
+from app.core.ai_service_pool import ai_service_pool
 from app.api.endpoints import email_endpoints, ai_endpoints, auth_endpoints
+from app.services.ai_service import AIService, close_claude_client
 from app.startup import clear_gmail_sessions
 
 # Configure logging
 log_handlers = [logging.StreamHandler(sys.stdout)]
 
-# Only add file handler if not in container (for local development)
+# Only add file handler if not in container (for local development).
+# File writes happen on a listener thread; request handlers only enqueue records.
 if not os.getenv('DOCKER_CONTAINER'):
-    log_handlers.append(logging.FileHandler('app.log'))
+    log_queue = SimpleQueue()
+    log_listener = QueueListener(log_queue, logging.FileHandler('app.log'))
+    log_listener.start()
+    atexit.register(log_listener.stop)
+    log_handlers.append(QueueHandler(log_queue))
 
 logging.basicConfig(
     level=logging.INFO,
@@ -34,6 +48,51 @@ logger = logging.getLogger(__name__)
 # Get settings instance
 settings = get_settings()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Build shared service instances once and tear them down on shutdown."""
+    # Clear Gmail sessions on startup for fresh authentication
+    clear_gmail_sessions()
+    
+    # Session-scoped services are created lazily by the endpoint dependencies;
+    # AI services may hold a Gmail service, so also drop them when it leaves the pool
+    gmail_pool.add_eviction_listener(ai_service_pool.invalidate)
+    eviction_task = asyncio.create_task(gmail_pool.run_idle_eviction())
+    session_cleanup_task = asyncio.create_task(session_manager.run_periodic_cleanup())
+    session_flush_task = asyncio.create_task(session_manager.run_periodic_flush())
+    
+    # Session-independent AI service is built once for the process lifetime.
+    # Settings are cached, so a construction failure is permanent until restart;
+    # keep the error so dependencies can re-raise it without retrying.
+    app.state.ai_service_error = None
+    try:
+        app.state.ai_service = AIService()
+    except EmailAIException as e:
+        logger.warning("⚠️ AI service not available at startup: %s", e)
+        app.state.ai_service = None
+        app.state.ai_service_error = e
+    
+    # Also sweeps expired summaries, including the shared service's cache
+    ai_eviction_task = asyncio.create_task(ai_service_pool.run_idle_eviction(shared_service=app.state.ai_service))
+    
+    logger.info("🎯 Application startup complete!")
+    logger.info("📋 Environment: %s", 'Development' if settings.debug else 'Production')
+    logger.info("🌐 Host: %s:%s", settings.host, settings.port)
+    
+    yield
+    
+    logger.info("🔄 Application shutting down...")
+    eviction_task.cancel()
+    ai_eviction_task.cancel()
+    session_cleanup_task.cancel()
+    session_flush_task.cancel()
+    session_manager.flush_dirty_sessions()
+    gmail_pool.clear()
+    ai_service_pool.clear()
+    await close_claude_client()
+
+
 def create_application() -> FastAPI:
     """Create and configure FastAPI application."""
     logger.info("🚀 Starting Email AI Assistant application...")
@@ -44,13 +103,15 @@ def create_application() -> FastAPI:
         description="AI-powered email management and response generation",
         version="1.0.0",
         docs_url="/docs" if settings.debug else None,
-        redoc_url="/redoc" if settings.debug else None
+        redoc_url="/redoc" if settings.debug else None,
+        default_response_class=ORJSONResponse,
+        lifespan=lifespan
     )
     
     logger.info("✅ FastAPI application instance created")
     
     # Add CORS middleware
-    logger.info(f"🔧 Configuring CORS with origins: {settings.cors_origins}")
+    logger.info("🔧 Configuring CORS with origins: %s", settings.cors_origins)
     app.add_middleware(
         CORSMiddleware,
         allow_origins=settings.cors_origins,
@@ -60,103 +121,37 @@ def create_application() -> FastAPI:
     )
     logger.info("✅ CORS middleware configured")
     
-    # Add session management middleware
-    @app.middleware("http")
-    async def session_middleware(request: Request, call_next):
-        """Middleware to handle session management."""
-        # Get tab ID from header (sent by frontend)
-        tab_id = request.headers.get("X-Tab-ID")
-        
-        # Special handling for OAuth callback - use state parameter to find session
-        if request.url.path == "/auth/gmail/callback":
-            state = request.query_params.get("state")
-            if state and state != "no_session" and session_manager.is_valid_session(state):
-                session_id = state
-                logger.info(f"🔗 OAuth callback using session from state: {session_id}")
-            else:
-                # Fallback for callback without valid state
-                session_id = session_manager.create_session()
-                logger.warning(f"⚠️ OAuth callback with invalid state, created new session: {session_id}")
-        elif tab_id:
-            # Regular tab-specific session handling
-            session_id = tab_id
-            if not session_manager.is_valid_session(session_id):
-                session_manager.create_session_with_id(session_id)
-                logger.info(f"🆕 Created new tab session: {session_id}")
-            else:
-                logger.debug(f"🔄 Using existing tab session: {session_id}")
-        else:
-            # Fallback: use cookie-based session
-            session_id = request.cookies.get("session_id")
-            if not session_id or not session_manager.is_valid_session(session_id):
-                session_id = session_manager.create_session()
-                logger.info(f"🆕 Created new cookie session: {session_id}")
-            else:
-                logger.debug(f"🔄 Using existing cookie session: {session_id}")
-        
-        request.state.session_id = session_id
-        response = await call_next(request)
-        
-        # Set session cookie for non-tab-based requests
-        if not tab_id and request.url.path != "/auth/gmail/callback":
-            response.set_cookie(
-                key="session_id",
-                value=session_id,
-                httponly=False,  # Allow JavaScript access
-                secure=False,  # Set to True in production with HTTPS
-                samesite="lax",
-                max_age=None  # Session cookie - expires when browser closes
-            )
-        
-        return response
+    # Session resolution and request logging share one middleware pass;
+    # outside debug mode uvicorn's access log already records every request
+    app.add_middleware(SessionAndLoggingMiddleware, log_requests=settings.debug)
+    logger.info("✅ Session and logging middleware configured")
     
     # Register API routers
-    logger.info("🔌 Registering API routers...")
     app.include_router(auth_endpoints.router, prefix="/auth", tags=["authentication"])
-    logger.info("✅ Auth endpoints registered")
-    
     app.include_router(email_endpoints.router, prefix="/api/emails", tags=["emails"])
-    logger.info("✅ Email endpoints registered")
-    
     app.include_router(ai_endpoints.router, prefix="/api/ai", tags=["ai"])
-    logger.info("✅ AI endpoints registered")
-    
-    # Request logging middleware
-    @app.middleware("http")
-    async def log_requests(request: Request, call_next):
-        start_time = time.time()
-        logger.info(f"📥 {request.method} {request.url.path} - Client: {request.client.host}")
-        
-        response = await call_next(request)
-        
-        process_time = time.time() - start_time
-        logger.info(f"📤 {request.method} {request.url.path} - Status: {response.status_code} - Time: {process_time:.3f}s")
-        
-        return response
+    logger.info("🔌 API routers registered: /auth, /api/emails, /api/ai")
     
     # Global exception handler
+    allow_any_origin = "*" in settings.cors_origins
+    allowed_origins = frozenset(settings.cors_origins)
+
     @app.exception_handler(Exception)
     async def global_exception_handler(request: Request, exc: Exception):
-        logger.error(f"❌ Unhandled exception: {str(exc)}", exc_info=True)
-        return JSONResponse(
+        logger.exception("❌ Unhandled exception on %s %s: %s", request.method, request.url.path, exc)
+        # Exception handlers run outside CORSMiddleware, so the 500 needs its own CORS
+        # headers or the browser hides it from the frontend as a network error
+        headers = {"Vary": "Origin"}
+        origin = request.headers.get("origin")
+        if origin and (allow_any_origin or origin in allowed_origins):
+            headers["Access-Control-Allow-Origin"] = origin
+            headers["Access-Control-Allow-Credentials"] = "true"
+        return ORJSONResponse(
             status_code=500,
-            content={"detail": "Internal server error", "type": "InternalServerError"}
+            content={"detail": "Internal server error", "type": "InternalServerError"},
+            headers=headers
         )
     
-    # Startup event
-    @app.on_event("startup")
-    async def startup_event():
-        # Clear Gmail sessions on startup for fresh authentication
-        clear_gmail_sessions()
-        logger.info("🎯 Application startup complete!")
-        logger.info(f"📋 Environment: {'Development' if settings.debug else 'Production'}")
-        logger.info(f"�� Host: {settings.host}:{settings.port}")
-    
-    # Shutdown event
-    @app.on_event("shutdown")
-    async def shutdown_event():
-        logger.info("🔄 Application shutting down...")
-    
     # Root endpoint
     @app.get("/")
     async def root():
@@ -174,16 +169,25 @@ def create_application() -> FastAPI:
 # Create app instance
 app = create_application()
 
-if __name__ == "__main__":
-    import uvicorn
-    
-    logger.info(f"📍 Server will run on {settings.host}:{settings.port}")
-    logger.info(f"🔧 Debug mode: {settings.debug}")
+def run():
+    """Run the API server with the C-accelerated event loop and HTTP parser."""
+    logger.info("📍 Server will run on %s:%s", settings.host, settings.port)
+    logger.info("🔧 Debug mode: %s", settings.debug)
     
     uvicorn.run(
         "app.main:app",
         host=settings.host,
         port=settings.port,
         reload=settings.debug,
-        log_level="info"
+        log_level="info",
+        access_log=True,
+        loop="asyncio" if sys.platform == "win32" else "uvloop",  # uvloop has no Windows build
+        http="httptools",
+        # Sessions and Gmail clients are cached per process, so default to one worker;
+        # uvicorn ignores workers when reloading, so debug runs always use one
+        workers=None if settings.debug else int(os.getenv("WEB_CONCURRENCY", "1"))
     )
+
+
+if __name__ == "__main__":
+    run()
@@ -3,49 +3,66 @@ Pydantic models for email-related data structures.
 Follows Single Responsibility Principle - handles only data models.
 """
 from datetime import datetime
-from typing import List, Optional, Dict, Any
-from pydantic import BaseModel, EmailStr, validator
-from enum import Enum
+from typing import Annotated, List, Optional, Dict, Any
+from pydantic import (
+    BaseModel, BeforeValidator, ConfigDict, EmailStr, Field, PlainSerializer,
+    WithJsonSchema, field_validator
+)
+from enum import IntEnum
 
 
-class EmailPriority(str, Enum):
-    """Email priority levels."""
-    LOW = "low"
-    MEDIUM = "medium"
-    HIGH = "high"
-    URGENT = "urgent"
+class EmailPriority(IntEnum):
+    """Email priority levels, ordered so they compare and index as integers."""
+    LOW = 0
+    MEDIUM = 1
+    HIGH = 2
+    URGENT = 3
+    
+    @property
+    def label(self) -> str:
+        """Lowercase name used on the API boundary (e.g. "medium")."""
+        return self.name.lower()
+
+
+def _parse_priority(value: Any) -> Any:
+    """Accept the API's string labels as well as integer priorities."""
+    if isinstance(value, str):
+        try:
+            return EmailPriority[value.upper()]
+        except KeyError:
+            raise ValueError(f"Invalid priority: {value}")
+    return value
+
+
+# Integer internally, but still read and written as "low"/"medium"/"high"/"urgent"
+PriorityField = Annotated[
+    EmailPriority,
+    BeforeValidator(_parse_priority),
+    PlainSerializer(lambda priority: priority.label, return_type=str),
+    WithJsonSchema({"type": "string", "enum": [priority.label for priority in EmailPriority]}),
+]
 
 
 class EmailDomain(BaseModel):
     """Email domain information."""
     domain: str
     count: int
-    importance_score: float
+    importance_score: float = Field(ge=0.0, le=1.0)
     last_received: Optional[datetime] = None
-    
-    @validator('importance_score')
-    def validate_importance_score(cls, v):
-        if not 0 <= v <= 1:
-            raise ValueError('Importance score must be between 0 and 1')
-        return v
 
 
 class EmailContent(BaseModel):
     """Email content structure."""
+    model_config = ConfigDict(from_attributes=True)
+    
     subject: str
-    body: str
+    body: str = Field(max_length=10000)  # Max length from config
     sender: EmailStr
     recipient: EmailStr
     received_date: datetime
-    priority: EmailPriority = EmailPriority.MEDIUM
+    priority: PriorityField = Field(default=EmailPriority.MEDIUM, json_schema_extra={"default": "medium"})
     domain: str
     message_id: Optional[str] = None  # Gmail message ID for on-demand loading
-    
-    @validator('body')
-    def validate_body_length(cls, v):
-        if len(v) > 10000:  # Max length from config
-            raise ValueError('Email body too long')
-        return v
 
 
 class EmailSummary(BaseModel):
@@ -54,7 +71,7 @@ class EmailSummary(BaseModel):
     summary: str
     key_points: List[str]
     action_required: bool
-    urgency_level: EmailPriority
+    urgency_level: PriorityField
     suggested_response_tone: str
 
 
@@ -64,25 +81,26 @@ class ResponseRequest(BaseModel):
     user_input: str
     tone: Optional[str] = "professional"
     
-    @validator('user_input')
+    @field_validator('user_input')
+    @classmethod
     def validate_user_input(cls, v):
         if not v.strip():
             raise ValueError('User input cannot be empty')
         return v
 
 
+class SendReplyRequest(BaseModel):
+    """Request for sending a reply to an email."""
+    original_email: EmailContent
+    reply_body: str = ""
+
+
 class ResponseGeneration(BaseModel):
     """Generated email response."""
     original_email: EmailContent
     user_input: str
     generated_response: str
-    confidence_score: float
-    
-    @validator('confidence_score')
-    def validate_confidence_score(cls, v):
-        if not 0 <= v <= 1:
-            raise ValueError('Confidence score must be between 0 and 1')
-        return v
+    confidence_score: float = Field(ge=0.0, le=1.0)
 
 
 class DomainAnalysis(BaseModel):
@@ -3,18 +3,27 @@ AI service for email summarization and response generation.
 Follows Single Responsibility Principle - handles only AI operations.
 Uses Claude API for all AI operations with YAML-based prompt management.
 """
+import asyncio
 import logging
 import time
 import yaml
 import os
-from typing import List, Dict, Any
+import re
+import string
+from functools import lru_cache, partial
+from types import MappingProxyType
+from typing import List, Dict, Any, Optional, Tuple
 import anthropic
+import httpx
+import orjson
 
 from app.models.email_models import (
     EmailContent, EmailSummary, ResponseRequest, ResponseGeneration, EmailPriority
 )
 from app.core.config import get_settings
 from app.core.exceptions import AIServiceException, APIKeyMissingException
+from app.core.gmail_pool import gmail_pool, run_gmail
+from app.core.summary_cache import SummaryCache
 
 # Configure logger
 logger = logging.getLogger(__name__)
@@ -22,6 +31,68 @@ logger = logging.getLogger(__name__)
 # Get settings instance
 settings = get_settings()
 
+# Use the libyaml-backed loader when PyYAML was built with it
+_YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+# Caps in-flight Claude requests across every AIService in the process so
+# concurrent sessions and fan-out helpers stay within the account's rate limits;
+# summary cache hits return before taking a slot
+_CLAUDE_SEMAPHORE = asyncio.Semaphore(max(1, settings.claude_concurrency))
+
+# One Claude client per process so every AIService reuses the same connection pool
+_CLAUDE_CLIENT: Optional[anthropic.AsyncAnthropic] = None
+
+
+def _get_client(api_key: str) -> anthropic.AsyncAnthropic:
+    """Get the shared Claude client, creating it on first use."""
+    global _CLAUDE_CLIENT
+    if _CLAUDE_CLIENT is None:
+        _CLAUDE_CLIENT = anthropic.AsyncAnthropic(
+            api_key=api_key,
+            http_client=anthropic.DefaultAsyncHttpxClient(
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=50)
+            )
+        )
+    return _CLAUDE_CLIENT
+
+
+async def close_claude_client():
+    """Close the shared Claude client's connections on shutdown."""
+    global _CLAUDE_CLIENT
+    if _CLAUDE_CLIENT is not None:
+        await _CLAUDE_CLIENT.close()
+        _CLAUDE_CLIENT = None
+
+
+# Structured summary output: Claude fills in this tool's input instead of free text
+_SUMMARY_TOOL = {
+    "name": "return_summary",
+    "description": "Return the structured analysis of the email.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "summary": {"type": "string", "description": "A concise 2-3 sentence summary"},
+            "key_points": {"type": "array", "items": {"type": "string"}},
+            "action_required": {"type": "boolean"},
+            "urgency_level": {"type": "string", "enum": [priority.label for priority in EmailPriority]},
+            "suggested_tone": {"type": "string", "enum": ["professional", "friendly", "urgent", "formal", "apologetic"]}
+        },
+        "required": ["summary", "key_points", "action_required", "urgency_level", "suggested_tone"]
+    }
+}
+_SUMMARY_TOOL_CHOICE = {"type": "tool", "name": _SUMMARY_TOOL["name"]}
+_URGENCY_LABELS = frozenset(priority.label for priority in EmailPriority)
+
+# Parsed prompts keyed by (path, mtime_ns) so every AIService shares one parse
+_PROMPTS_CACHE: Dict[tuple, Dict[str, Any]] = {}
+
+_FORMATTER = string.Formatter()
+
+
+def _parse_template(template: str) -> tuple:
+    """Split a str.format template once into (literal, field, conversion, spec) segments."""
+    return tuple(_FORMATTER.parse(template))
+
 
 class PromptManager:
     """Manages prompt templates from YAML configuration."""
@@ -33,17 +104,28 @@ class PromptManager:
         logger.info("📋 PromptManager initialized with YAML configuration")
     
     def _load_prompts(self) -> Dict[str, Any]:
-        """Load prompts from YAML file."""
+        """Load prompts from YAML file, reusing the parsed config while the file is unchanged."""
         try:
-            with open(self.prompts_file_path, 'r', encoding='utf-8') as file:
-                config = yaml.safe_load(file)
-                logger.info(f"✅ Loaded prompts configuration from {self.prompts_file_path}")
+            cache_key = (self.prompts_file_path, os.stat(self.prompts_file_path).st_mtime_ns)
+            config = _PROMPTS_CACHE.get(cache_key)
+            if config is not None:
                 return config
+            
+            with open(self.prompts_file_path, 'r', encoding='utf-8') as file:
+                config = yaml.load(file, Loader=_YAML_LOADER)
+            for prompt_config in config.get('prompts', {}).values():
+                prompt_config['_parsed'] = _parse_template(prompt_config['template'])
+            # Entries for older mtimes of this file can never match again
+            for stale_key in [key for key in _PROMPTS_CACHE if key[0] == self.prompts_file_path]:
+                del _PROMPTS_CACHE[stale_key]
+            _PROMPTS_CACHE[cache_key] = config
+            logger.info("✅ Loaded prompts configuration from %s", self.prompts_file_path)
+            return config
         except FileNotFoundError:
-            logger.error(f"❌ Prompts file not found: {self.prompts_file_path}")
+            logger.error("❌ Prompts file not found: %s", self.prompts_file_path)
             raise AIServiceException(f"Prompts file not found: {self.prompts_file_path}")
         except yaml.YAMLError as e:
-            logger.error(f"❌ Error parsing YAML prompts file: {str(e)}")
+            logger.error("❌ Error parsing YAML prompts file: %s", e)
             raise AIServiceException(f"Error parsing YAML prompts file: {str(e)}")
     
     def get_prompt(self, prompt_name: str) -> str:
@@ -52,21 +134,39 @@ class PromptManager:
             prompt_config = self.prompts_config['prompts'][prompt_name]
             template = prompt_config['template']
             current_version = prompt_config.get('current_version', 'unknown')
-            logger.debug(f"📝 Retrieved prompt '{prompt_name}' (current_version: {current_version})")
+            logger.debug("📝 Retrieved prompt '%s' (current_version: %s)", prompt_name, current_version)
             return template
         except KeyError as e:
-            logger.error(f"❌ Prompt '{prompt_name}' not found in configuration")
+            logger.error("❌ Prompt '%s' not found in configuration", prompt_name)
+            raise AIServiceException(f"Prompt '{prompt_name}' not found in configuration")
+    
+    def render_prompt(self, prompt_name: str, **values: Any) -> str:
+        """Render a prompt template from its pre-parsed segments."""
+        try:
+            segments = self.prompts_config['prompts'][prompt_name]['_parsed']
+        except KeyError:
+            logger.error("❌ Prompt '%s' not found in configuration", prompt_name)
             raise AIServiceException(f"Prompt '{prompt_name}' not found in configuration")
+        
+        parts = []
+        for literal, field_name, conversion, format_spec in segments:
+            parts.append(literal)
+            if field_name is not None:
+                value = values[field_name]
+                if conversion:
+                    value = _FORMATTER.convert_field(value, conversion)
+                parts.append(format(value, format_spec) if format_spec else str(value))
+        return "".join(parts)
     
     def get_prompt_version(self, prompt_name: str) -> str:
         """Get the current version of a specific prompt."""
         try:
             prompt_config = self.prompts_config['prompts'][prompt_name]
             current_version = prompt_config.get('current_version', 'unknown')
-            logger.debug(f"📋 Retrieved version for prompt '{prompt_name}': {current_version}")
+            logger.debug("📋 Retrieved version for prompt '%s': %s", prompt_name, current_version)
             return current_version
         except KeyError as e:
-            logger.error(f"❌ Prompt '{prompt_name}' not found in configuration")
+            logger.error("❌ Prompt '%s' not found in configuration", prompt_name)
             raise AIServiceException(f"Prompt '{prompt_name}' not found in configuration")
     
     def get_all_prompt_versions(self) -> Dict[str, str]:
@@ -76,94 +176,115 @@ class PromptManager:
             for prompt_name, prompt_config in self.prompts_config['prompts'].items():
                 current_version = prompt_config.get('current_version', 'unknown')
                 versions[prompt_name] = current_version
-            logger.debug(f"📋 Retrieved versions for {len(versions)} prompts")
+            logger.debug("📋 Retrieved versions for %s prompts", len(versions))
             return versions
         except Exception as e:
-            logger.error(f"❌ Error retrieving prompt versions: {str(e)}")
+            logger.error("❌ Error retrieving prompt versions: %s", e)
             return {}
     
+    def get_system_prompt(self, prompt_name: str) -> Optional[str]:
+        """Get the static system instructions for a prompt, if it defines any."""
+        return self.prompts_config['prompts'].get(prompt_name, {}).get('system')
+    
     def get_config(self, config_key: str, default=None):
         """Get configuration value."""
         return self.prompts_config.get('config', {}).get(config_key, default)
 
 
+# Common business/service mailbox names and the team name used to address them
+_BUSINESS_PATTERNS = MappingProxyType({
+    'hi': 'Team',
+    'hello': 'Team',
+    'info': 'Team',
+    'support': 'Support Team',
+    'noreply': 'Team',
+    'no-reply': 'Team',
+    'admin': 'Admin Team',
+    'contact': 'Team'
+})
+
+
 class SignatureExtractor:
     """Extracts sender names from email for signature generation."""
     
-    def __init__(self, gmail_service=None):
-        """Initialize with Gmail service for user profile access."""
+    def __init__(self, gmail_service=None, session_id: Optional[str] = None):
+        """Initialize with a Gmail service, or a session ID to resolve one lazily."""
         self.gmail_service = gmail_service
+        self.session_id = session_id
+        self._reply_name: Optional[str] = None
+    
+    async def _resolve_gmail_service(self):
+        """Gmail service for profile access, pulled from the pool only when first needed."""
+        if self.gmail_service is None and self.session_id:
+            self.gmail_service = await gmail_pool.aget_or_create(self.session_id)
+        return self.gmail_service
     
     @staticmethod
     def extract_sender_name(email: EmailContent) -> str:
         """Extract sender name from email address."""
-        logger.debug(f"🔍 Extracting sender name from: {email.sender}")
-        
-        # Extract name from email address
-        email_address = str(email.sender)
+        return SignatureExtractor._parse_sender(str(email.sender))
+    
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def _parse_sender(email_address: str) -> str:
+        """Derive a display name from a sender address; repeated senders hit the cache."""
+        logger.debug("🔍 Extracting sender name from: %s", email_address)
         
         # Try to extract name from email format like "John Doe <john@example.com>"
         if '<' in email_address and '>' in email_address:
             name_part = email_address.split('<')[0].strip()
             if name_part:
-                logger.debug(f"📝 Extracted name from email format: {name_part}")
+                logger.debug("📝 Extracted name from email format: %s", name_part)
                 return name_part
         
         # Extract name from email address (before @)
-        local_part = email_address.split('@')[0]
-        domain_part = email_address.split('@')[1] if '@' in email_address else ''
-        
-        # Handle common business/service email patterns
-        business_patterns = {
-            'hi': 'Team',
-            'hello': 'Team', 
-            'info': 'Team',
-            'support': 'Support Team',
-            'noreply': 'Team',
-            'no-reply': 'Team',
-            'admin': 'Admin Team',
-            'contact': 'Team'
-        }
+        local_part, _, domain_part = email_address.partition('@')
         
         # Check if it's a business email pattern
-        if local_part.lower() in business_patterns:
+        team_name = _BUSINESS_PATTERNS.get(local_part.lower())
+        if team_name:
             # Extract company name from domain
-            domain_name = domain_part.split('.')[0] if '.' in domain_part else domain_part
+            domain_name = domain_part.split('.', 1)[0]
             company_name = domain_name.replace('-', ' ').replace('_', ' ').title()
-            logger.debug(f"📝 Extracted business sender: {company_name} {business_patterns[local_part.lower()]}")
-            return f"{company_name} {business_patterns[local_part.lower()]}"
+            logger.debug("📝 Extracted business sender: %s %s", company_name, team_name)
+            return f"{company_name} {team_name}"
         
         # Convert common email formats to names
         if '.' in local_part:
             # john.doe -> John Doe
             name_parts = local_part.split('.')
             formatted_name = ' '.join(part.capitalize() for part in name_parts)
-            logger.debug(f"📝 Formatted name from email: {formatted_name}")
+            logger.debug("📝 Formatted name from email: %s", formatted_name)
             return formatted_name
         else:
             # john -> John
             formatted_name = local_part.capitalize()
-            logger.debug(f"📝 Formatted name from email: {formatted_name}")
+            logger.debug("📝 Formatted name from email: %s", formatted_name)
             return formatted_name
     
-    def extract_reply_sender_name(self) -> str:
+    async def extract_reply_sender_name(self) -> str:
         """Extract the name of the person sending the reply (current authenticated user)."""
+        # The authenticated user only changes on re-authentication, which resets this
+        if self._reply_name is not None:
+            return self._reply_name
+        
         try:
             # Check if Gmail service is available
-            if not self.gmail_service:
+            gmail_service = await self._resolve_gmail_service()
+            if not gmail_service:
                 logger.warning("⚠️ Gmail service not available, using fallback name")
                 return "User"
             
             # Get the authenticated user's profile from Gmail
-            if not self.gmail_service.is_authenticated():
+            if not gmail_service.is_authenticated():
                 logger.warning("⚠️ Gmail not authenticated, using fallback name")
                 return "User"
             
-            profile = self.gmail_service.get_user_profile()
+            profile = await run_gmail(gmail_service, gmail_service.get_user_profile)
             user_email = profile.get('email', '')
             
             if user_email:
-                logger.debug(f"🔍 Extracting reply sender name from authenticated email: {user_email}")
+                logger.debug("🔍 Extracting reply sender name from authenticated email: %s", user_email)
                 
                 # Use the same extraction logic as for regular emails
                 local_part = user_email.split('@')[0]
@@ -173,107 +294,154 @@ class SignatureExtractor:
                     # john.doe -> John Doe
                     name_parts = local_part.split('.')
                     formatted_name = ' '.join(part.capitalize() for part in name_parts)
-                    logger.debug(f"📝 Extracted reply sender name: {formatted_name}")
-                    return formatted_name
                 else:
                     # john -> John
                     formatted_name = local_part.capitalize()
-                    logger.debug(f"📝 Extracted reply sender name: {formatted_name}")
-                    return formatted_name
+                logger.debug("📝 Extracted reply sender name: %s", formatted_name)
+                self._reply_name = formatted_name
+                return formatted_name
             else:
                 logger.warning("⚠️ Could not get user email from profile, using fallback")
                 return "User"
                 
         except Exception as e:
-            logger.error(f"❌ Error extracting reply sender name: {e}")
+            logger.error("❌ Error extracting reply sender name: %s", e)
             return "User"  # Fallback
+    
+    def reset_reply_name(self):
+        """Forget the cached reply sender name, e.g. after the session re-authenticates."""
+        self._reply_name = None
 
 
 class ClaudeProvider:
     """Claude API provider implementation with YAML prompt support."""
     
-    def __init__(self, api_key: str, prompt_manager: PromptManager, gmail_service=None):
+    def __init__(self, api_key: str, prompt_manager: PromptManager, gmail_service=None, session_id: Optional[str] = None):
         logger.info("🔧 Initializing Claude API provider...")
         if not api_key:
             logger.error("❌ Claude API key is missing")
             raise APIKeyMissingException("Claude API key is required")
         
         try:
-            self.client = anthropic.Anthropic(api_key=api_key)
+            self.client = _get_client(api_key)
             self.prompt_manager = prompt_manager
-            self.signature_extractor = SignatureExtractor(gmail_service) if gmail_service else SignatureExtractor(None)
+            self.signature_extractor = SignatureExtractor(gmail_service, session_id)
+            
+            # Prompt configuration is fixed for the provider's lifetime, so read it once
+            default_model = prompt_manager.get_config('model', 'claude-sonnet-4-20250514')
+            self._model_summary = prompt_manager.get_config('model_summarization', default_model)
+            self._model_response = prompt_manager.get_config('model_response', default_model)
+            self._max_tokens_summary = prompt_manager.get_config('max_tokens_summarization', 500)
+            self._max_tokens_response = prompt_manager.get_config('max_tokens_response', 300)
+            self._prompt_versions = prompt_manager.get_all_prompt_versions()
+            
+            # Static system instructions per prompt; they are far below the minimum
+            # cacheable prompt length, so no cache_control breakpoint is set
+            self._system_blocks = {
+                prompt_name: [{"type": "text", "text": system_prompt}]
+                for prompt_name in self._prompt_versions
+                if (system_prompt := prompt_manager.get_system_prompt(prompt_name))
+            }
+            
+            # Recent summaries for this session, so duplicate and near-duplicate
+            # newsletters and notifications skip the Claude call
+            self.summary_cache = SummaryCache(namespace=f"claude:{self._model_summary}")
+            # Extra request options for the interactive Claude calls
+            self._request_options = (
+                {"extra_body": {"performance_config": {"latency": "optimized"}}}
+                if prompt_manager.get_config('latency_mode', 'standard') == 'optimized' else {}
+            )
+            
+            # Summary request arguments never change after startup, so bind them once;
+            # per call only the messages are added
+            self._summary_params = {
+                "model": self._model_summary,
+                "max_tokens": self._max_tokens_summary,
+                "tools": [_SUMMARY_TOOL],
+                "tool_choice": _SUMMARY_TOOL_CHOICE
+            }
+            if 'summarization' in self._system_blocks:
+                self._summary_params["system"] = self._system_blocks['summarization']
+            self._summarize_call = partial(self._create_message, **self._summary_params, **self._request_options)
             logger.info("✅ Claude API client initialized successfully")
         except Exception as e:
-            logger.error(f"❌ Failed to initialize Claude client: {str(e)}")
+            logger.error("❌ Failed to initialize Claude client: %s", e)
             raise AIServiceException(f"Failed to initialize Claude client: {str(e)}")
     
     async def summarize_email(self, email: EmailContent) -> EmailSummary:
         """Summarize email using Claude."""
         start_time = time.time()
-        logger.info(f"📄 Starting email summarization for email from {email.sender}")
-        logger.debug(f"📧 Email details - Subject: '{email.subject}', Body length: {len(email.body)} chars")
+        logger.info("📄 Starting email summarization for email from %s", email.sender)
+        logger.debug("📧 Email details - Subject: '%s', Body length: %s chars", email.subject, len(email.body))
+        
+        cache_key = self.summary_cache.make_key(email)
+        cached = self.summary_cache.get(cache_key)
+        if cached is not None:
+            logger.info("♻️ Reusing cached summary for matching email content")
+            return cached.model_copy(update={"original_email": email})
         
         try:
             prompt = self._create_summary_prompt(email)
-            prompt_version = self.prompt_manager.get_prompt_version('summarization')
-            logger.debug(f"🤖 Generated prompt for summarization (version: {prompt_version}, length: {len(prompt)} chars)")
-            
-            max_tokens = self.prompt_manager.get_config('max_tokens_summarization', 500)
-            model = self.prompt_manager.get_config('model', 'claude-sonnet-4-20250514')
+            prompt_version = self._prompt_versions.get('summarization', 'unknown')
+            logger.debug("🤖 Generated prompt for summarization (version: %s, length: %s chars)", prompt_version, len(prompt))
             
             logger.info("🔄 Sending request to Claude API for summarization...")
-            response = self.client.messages.create(
-                model=model,
-                max_tokens=max_tokens,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ]
+            response = await self._summarize_call(
+                messages=[{"role": "user", "content": prompt}]
             )
             
             processing_time = time.time() - start_time
-            logger.info(f"✅ Claude API response received in {processing_time:.3f}s")
-            
-            content = response.content[0].text
-            logger.debug(f"📝 Claude response length: {len(content)} chars")
+            logger.info("✅ Claude API response received in %.3fs", processing_time)
             
-            summary = self._parse_summary_response(content, email)
-            logger.info(f"🎯 Email summarization completed - Urgency: {summary.urgency_level}, Action Required: {summary.action_required}")
+            summary = self._summary_from_message(response, email)
+            self.summary_cache.put(cache_key, summary)
+            logger.info("🎯 Email summarization completed - Urgency: %s, Action Required: %s", summary.urgency_level.label, summary.action_required)
             
             return summary
             
         except Exception as e:
-            logger.error(f"❌ Claude summarization failed: {str(e)}", exc_info=True)
+            logger.error("❌ Claude summarization failed: %s", e, exc_info=True)
             raise AIServiceException(f"Claude summarization failed: {str(e)}")
     
     async def generate_response(self, request: ResponseRequest) -> ResponseGeneration:
         """Generate email response using Claude."""
         start_time = time.time()
-        logger.info(f"✍️ Starting response generation for email from {request.original_email.sender}")
-        logger.info(f"📋 User instructions: '{request.user_input}' | Tone: {request.tone}")
+        logger.info("✍️ Starting response generation for email from %s", request.original_email.sender)
+        logger.info("📋 User instructions: '%s' | Tone: %s", request.user_input, request.tone)
         
         try:
-            prompt = self._create_response_prompt(request)
+            prompt = await self._create_response_prompt(request)
             prompt_name = self._get_response_prompt_name(request.tone)
-            prompt_version = self.prompt_manager.get_prompt_version(prompt_name)
-            logger.debug(f"🤖 Generated prompt for response (version: {prompt_version}, length: {len(prompt)} chars)")
-            
-            max_tokens = self.prompt_manager.get_config('max_tokens_response', 300)
-            model = self.prompt_manager.get_config('model', 'claude-sonnet-4-20250514')
+            prompt_version = self._prompt_versions.get(prompt_name, 'unknown')
+            logger.debug("🤖 Generated prompt for response (version: %s, length: %s chars)", prompt_version, len(prompt))
             
             logger.info("🔄 Sending request to Claude API for response generation...")
-            response = self.client.messages.create(
-                model=model,
-                max_tokens=max_tokens,
+            buffer = []
+            async with _CLAUDE_SEMAPHORE, self.client.messages.stream(
+                model=self._model_response,
+                max_tokens=self._max_tokens_response,
+                system=self._system_blocks.get(prompt_name, anthropic.NOT_GIVEN),
                 messages=[
                     {"role": "user", "content": prompt}
-                ]
-            )
+                ],
+                **self._request_options
+            ) as stream:
+                async for text in stream.text_stream:
+                    buffer.append(text)
+                    if '\n' in text:
+                        content = "".join(buffer)
+                        buffer = [content]
+                        # The prompt ends replies with the signature; stop once its name line is done
+                        signature = self._SIGNATURE_RE.search(content)
+                        if signature:
+                            buffer = [content[:signature.end()]]
+                            break
             
             processing_time = time.time() - start_time
-            logger.info(f"✅ Claude API response received in {processing_time:.3f}s")
+            logger.info("✅ Claude API response received in %.3fs", processing_time)
             
-            generated_text = response.content[0].text.strip()
-            logger.info(f"📝 Generated response length: {len(generated_text)} chars")
+            generated_text = "".join(buffer).strip()
+            logger.info("📝 Generated response length: %s chars", len(generated_text))
             
             result = ResponseGeneration(
                 original_email=request.original_email,
@@ -282,55 +450,61 @@ class ClaudeProvider:
                 confidence_score=0.88  # Mock confidence score
             )
             
-            logger.info(f"🎉 Response generation completed successfully")
+            logger.info("🎉 Response generation completed successfully")
             return result
             
         except Exception as e:
-            logger.error(f"❌ Claude response generation failed: {str(e)}", exc_info=True)
+            logger.error("❌ Claude response generation failed: %s", e, exc_info=True)
             raise AIServiceException(f"Claude response generation failed: {str(e)}")
     
+    # "Sincerely," followed by a completed name line
+    _SIGNATURE_RE = re.compile(r'^[ \t]*Sincerely,[ \t]*\n[ \t]*\S[^\n]*\n', re.MULTILINE)
+    
+    # Tones with a dedicated template; anything else uses the generic response prompt
+    _TONE_PROMPTS = {
+        "formal": "response_generation_formal",
+        "friendly": "response_generation_friendly",
+        "urgent": "response_generation_urgent",
+        "apologetic": "response_generation_apologetic",
+    }
+    
     def _get_response_prompt_name(self, tone: str) -> str:
         """Get the appropriate prompt name based on tone."""
-        if tone:
-            tone_lower = tone.lower()
-            if tone_lower == "formal":
-                return "response_generation_formal"
-            elif tone_lower == "friendly":
-                return "response_generation_friendly"
-            elif tone_lower == "urgent":
-                return "response_generation_urgent"
-            elif tone_lower == "apologetic":
-                return "response_generation_apologetic"
-        return "response_generation"    
+        return self._TONE_PROMPTS.get(tone.lower(), "response_generation") if tone else "response_generation"
+    
+    async def _create_message(self, **params):
+        """Send a Messages API request once a Claude concurrency slot is free."""
+        async with _CLAUDE_SEMAPHORE:
+            return await self.client.messages.create(**params)
+    
     def _create_summary_prompt(self, email: EmailContent) -> str:
         """Create prompt for email summarization using YAML template."""
         logger.debug("📝 Creating summarization prompt from YAML template...")
-        template = self.prompt_manager.get_prompt('summarization')
-        
-        return template.format(
+        return self.prompt_manager.render_prompt(
+            'summarization',
             subject=email.subject,
             sender=email.sender,
             received_date=email.received_date,
             body=email.body
         )
     
-    def _create_response_prompt(self, request: ResponseRequest) -> str:
+    async def _create_response_prompt(self, request: ResponseRequest) -> str:
         """Create prompt for response generation using YAML template."""
         logger.debug("📝 Creating response generation prompt from YAML template...")
         
         # Extract original sender name (from the email we're replying to)
         original_sender_name = self.signature_extractor.extract_sender_name(request.original_email)
-        logger.debug(f"👤 Using original sender name: {original_sender_name}")
+        logger.debug("👤 Using original sender name: %s", original_sender_name)
         
         # Extract reply sender name (the person sending the reply)
-        reply_sender_name = self.signature_extractor.extract_reply_sender_name()
-        logger.debug(f"✍️ Using reply sender name: {reply_sender_name}")
+        reply_sender_name = await self.signature_extractor.extract_reply_sender_name()
+        logger.debug("✍️ Using reply sender name: %s", reply_sender_name)
         
         # Choose appropriate prompt based on tone
         prompt_name = self._get_response_prompt_name(request.tone)
-        template = self.prompt_manager.get_prompt(prompt_name)
         
-        return template.format(
+        return self.prompt_manager.render_prompt(
+            prompt_name,
             subject=request.original_email.subject,
             sender=request.original_email.sender,
             body=request.original_email.body,
@@ -340,86 +514,160 @@ class ClaudeProvider:
             reply_sender_name=reply_sender_name
         )
     
+    def _summary_from_message(self, message, email: EmailContent) -> EmailSummary:
+        """Build a summary from the structured tool call, falling back to parsing text."""
+        for block in message.content:
+            if block.type == "tool_use" and block.name == _SUMMARY_TOOL["name"]:
+                return self._summary_from_tool_input(block.input, email)
+        
+        logger.warning("⚠️ Claude returned no structured summary, parsing text response")
+        content = "".join(block.text for block in message.content if block.type == "text")
+        return self._parse_summary_response(content, email)
+    
+    def _summary_from_tool_input(self, data: Dict[str, Any], email: EmailContent) -> EmailSummary:
+        """Convert the summary tool's input into an EmailSummary object."""
+        urgency_level = str(data.get("urgency_level") or data.get("urgency") or "").lower()
+        summary = EmailSummary(
+            original_email=email,
+            summary=data.get("summary") or "Not available",
+            key_points=data.get("key_points") or ["No key points identified"],
+            action_required=bool(data.get("action_required", False)),
+            urgency_level=urgency_level if urgency_level in _URGENCY_LABELS else EmailPriority.MEDIUM,
+            suggested_response_tone=str(data.get("suggested_tone") or data.get("tone") or "professional").lower()
+        )
+        logger.debug("📊 Structured summary - Points: %s, Action: %s, Urgency: %s", len(summary.key_points), summary.action_required, summary.urgency_level.label)
+        return summary
+    
     def _parse_summary_response(self, content: str, email: EmailContent) -> EmailSummary:
         """Parse Claude response into EmailSummary object."""
         logger.debug("🔍 Parsing Claude summary response...")
         
-        # Similar parsing logic as OpenAI but adapted for Claude's response format
-        summary = self._extract_section(content, ["summary", "1."])
-        key_points = self._extract_key_points(content)
-        action_required = self._extract_action_required(content)
-        urgency_level = self._extract_urgency(content)
-        suggested_tone = self._extract_suggested_tone(content)
+        # JSON answers (e.g. a tool call the model wrote out as text) map straight onto the fields
+        stripped = content.strip()
+        if stripped.startswith('{'):
+            try:
+                data = orjson.loads(stripped)
+            except orjson.JSONDecodeError:
+                logger.debug("⚠️ Summary response looked like JSON but did not parse, using text parser")
+            else:
+                if isinstance(data, dict):
+                    return self._summary_from_tool_input(data, email)
+        
+        # Well-formed responses number all five sections, so one regex search splits them
+        match = self._SUMMARY_RE.search(content)
+        if match is not None:
+            section_values = {}
+            key_points = []
+            for section in self._SECTIONS:
+                header, _, rest = match[section].partition('\n')
+                section_values[section] = header.split(':', 1)[-1].strip() if ':' in header else header.strip()
+                if section == 'points':
+                    key_points = self._collect_points([section_values['points'], *rest.split('\n')])
+                elif section == 'summary' and rest.strip():
+                    # Keep summaries that wrap onto following lines
+                    section_values['summary'] = ' '.join((section_values['summary'], *rest.split())).strip()
+        else:
+            section_values, key_points = self._scan_summary_lines(content)
+        
+        summary = section_values.get('summary') or "Not available"
+        action_required = self._parse_action_required(section_values.get('action', "Not available"))
+        urgency_level = self._parse_urgency(section_values.get('urgency', "Not available"))
+        suggested_tone = section_values.get('tone', "").lower() or "professional"
         
-        logger.debug(f"📊 Parsed summary - Points: {len(key_points)}, Action: {action_required}, Urgency: {urgency_level}")
+        logger.debug("📊 Parsed summary - Points: %s, Action: %s, Urgency: %s", len(key_points), action_required, urgency_level.label)
         
         return EmailSummary(
             original_email=email,
             summary=summary,
-            key_points=key_points,
+            key_points=key_points if key_points else ["No key points identified"],
             action_required=action_required,
             urgency_level=urgency_level,
             suggested_response_tone=suggested_tone
         )
     
-    def _extract_section(self, content: str, keywords: List[str]) -> str:
-        """Extract a section from the response."""
-        lines = content.split('\n')
-        for line in lines:
-            for keyword in keywords:
-                if keyword.lower() in line.lower():
-                    return line.split(':', 1)[-1].strip() if ':' in line else line.strip()
-        return "Not available"
-    
-    def _extract_key_points(self, content: str) -> List[str]:
-        """Extract key points from the response."""
-        points = []
-        lines = content.split('\n')
+    def _scan_summary_lines(self, content: str) -> Tuple[Dict[str, str], List[str]]:
+        """Fallback for loosely formatted or partial responses: walk the lines once."""
+        # Header line value for each section, keeping the first match of each
+        section_values: Dict[str, str] = {}
+        points_lines = []
         in_points_section = False
         
-        for line in lines:
+        for line in content.split('\n'):
             line = line.strip()
-            if "key points" in line.lower() or "2." in line:
-                in_points_section = True
+            section = self._match_section(line, section_values)
+            
+            if section is None:
+                if in_points_section:
+                    points_lines.append(line)
                 continue
-            if in_points_section and (line.startswith('•') or line.startswith('-') or line.startswith('*')):
-                points.append(line.lstrip('•-* '))
-            elif in_points_section and line and not any(x in line.lower() for x in ['action', 'urgency', 'tone']):
-                points.append(line)
-            elif in_points_section and any(x in line.lower() for x in ['action', 'urgency', 'tone']):
-                break
+            
+            section_values[section] = line.split(':', 1)[-1].strip() if ':' in line else line
+            # Key points follow their header; any other header ends the list
+            in_points_section = section == 'points'
         
-        return points if points else ["No key points identified"]
+        return section_values, self._collect_points(points_lines)
     
-    def _extract_action_required(self, content: str) -> bool:
-        """Extract action required from the response."""
-        action_line = self._extract_section(content, ["action", "3."])
-        result = "yes" in action_line.lower() or "required" in action_line.lower()
-        logger.debug(f"🎯 Action required extracted: {result}")
-        return result
+    def _collect_points(self, lines: List[str]) -> List[str]:
+        """Strip bullets from the non-empty key point lines."""
+        points = []
+        for line in lines:
+            line = line.strip()
+            if line:
+                points.append(line.lstrip(self._BULLET_STRIP) if line[:1] in self._BULLETS else line)
+        return points
     
-    def _extract_urgency(self, content: str) -> EmailPriority:
-        """Extract urgency level from the response."""
-        urgency_line = self._extract_section(content, ["urgency", "4."])
-        urgency_text = urgency_line.lower()
-        
-        if "urgent" in urgency_text:
-            result = EmailPriority.URGENT
-        elif "high" in urgency_text:
-            result = EmailPriority.HIGH
-        elif "low" in urgency_text:
-            result = EmailPriority.LOW
-        else:
-            result = EmailPriority.MEDIUM
-        
-        logger.debug(f"⚡ Urgency level extracted: {result}")
+    # Response sections in prompt order; a header is marked by its keyword or its number
+    _SECTIONS = ('summary', 'points', 'action', 'urgency', 'tone')
+    _BULLETS = frozenset('•-*')
+    _BULLET_STRIP = '•-* \t'
+    _SUMMARY_RE = re.compile(
+        r'^\s*1\.\s*(?P<summary>.+?)^\s*2\.\s*(?P<points>.+?)^\s*3\.\s*(?P<action>.+?)'
+        r'^\s*4\.\s*(?P<urgency>.+?)^\s*5\.\s*(?P<tone>[^\n]+)',
+        re.DOTALL | re.MULTILINE
+    )
+    # Each alternative is a named group, so the match itself says which section it is
+    _SECTION_RE = re.compile(
+        r'\b(?:(?P<summary>summary)|(?P<points>key\s*points)|(?P<action>action)|(?P<urgency>urgency)|(?P<tone>tone))\b'
+        r'|(?P<number>[1-5])\.',
+        re.IGNORECASE
+    )
+    
+    _ACTION_RE = re.compile(r'yes|required', re.IGNORECASE)
+    # Word-start anchored so "below" or "follow" don't read as low urgency
+    _URGENCY_RE = re.compile(r'\b(urgent|high|low)', re.IGNORECASE)
+    _URGENCY_KEYWORDS = MappingProxyType({
+        'urgent': EmailPriority.URGENT,
+        'high': EmailPriority.HIGH,
+        'low': EmailPriority.LOW
+    })
+    
+    def _match_section(self, line: str, seen: Dict[str, str]) -> Optional[str]:
+        """Return the section whose header starts on this line, if one hasn't been seen yet."""
+        found = set()
+        for match in self._SECTION_RE.finditer(line):
+            section = match.lastgroup
+            found.add(self._SECTIONS[int(match.group('number')) - 1] if section == 'number' else section)
+        if found:
+            for section in self._SECTIONS:
+                if section in found and section not in seen:
+                    return section
+        return None
+    
+    def _parse_action_required(self, action_line: str) -> bool:
+        """Interpret the action required section."""
+        result = self._ACTION_RE.search(action_line) is not None
+        logger.debug("🎯 Action required extracted: %s", result)
         return result
     
-    def _extract_suggested_tone(self, content: str) -> str:
-        """Extract suggested tone from the response."""
-        tone_line = self._extract_section(content, ["tone", "5."])
-        result = tone_line.lower() if tone_line != "Not available" else "professional"
-        logger.debug(f"🎵 Suggested tone extracted: {result}")
+    def _parse_urgency(self, urgency_line: str) -> EmailPriority:
+        """Interpret the urgency section as a priority."""
+        # The strongest keyword wins, e.g. "high, not urgent" is still urgent
+        result = max(
+            (self._URGENCY_KEYWORDS[keyword.lower()] for keyword in self._URGENCY_RE.findall(urgency_line)),
+            default=EmailPriority.MEDIUM
+        )
+        
+        logger.debug("⚡ Urgency level extracted: %s", result)
         return result
 
 
@@ -429,7 +677,7 @@ class AIService:
     Follows Single Responsibility Principle with YAML prompt management.
     """
     
-    def __init__(self, gmail_service=None):
+    def __init__(self, gmail_service=None, session_id: Optional[str] = None):
         """Initialize AI service with Claude provider and prompt manager."""
         logger.info("🤖 Initializing AI Service...")
         
@@ -438,46 +686,62 @@ class AIService:
             raise APIKeyMissingException("Claude API key not configured. Please set CLAUDE_API_KEY in your .env file")
         
         try:
-            # Store Gmail service for signature extraction
-            self.gmail_service = gmail_service
+            self.provider_name = "claude"
             
             # Initialize prompt manager
             prompts_file_path = os.path.join(os.path.dirname(__file__), 'prompts.yaml')
             prompt_manager = PromptManager(prompts_file_path)
             
-            # Initialize Claude provider with Gmail service for signature extraction
-            self.provider = ClaudeProvider(settings.claude_api_key, prompt_manager, gmail_service)
+            # Initialize Claude provider; the Gmail service for signature extraction
+            # is resolved from the session pool only when a reply needs it
+            self.provider = ClaudeProvider(settings.claude_api_key, prompt_manager, gmail_service, session_id)
             logger.info("✅ AI Service initialized successfully with Claude provider and YAML prompts")
         except Exception as e:
-            logger.error(f"❌ Failed to initialize AI service: {str(e)}")
+            logger.error("❌ Failed to initialize AI service: %s", e)
             raise
     
     async def summarize_email(self, email: EmailContent) -> EmailSummary:
         """Summarize email using Claude AI."""
-        logger.info(f"📧 AI Service: Summarizing email '{email.subject}' from {email.sender}")
+        logger.info("📧 AI Service: Summarizing email '%s' from %s", email.subject, email.sender)
         try:
             result = await self.provider.summarize_email(email)
             logger.info("✅ Email summarization completed successfully")
             return result
         except Exception as e:
-            logger.error(f"❌ AI Service summarization failed: {str(e)}")
+            logger.error("❌ AI Service summarization failed: %s", e)
             raise
     
     async def generate_response(self, request: ResponseRequest) -> ResponseGeneration:
         """Generate email response using Claude AI."""
-        logger.info(f"✍️ AI Service: Generating response for email '{request.original_email.subject}'")
+        logger.info("✍️ AI Service: Generating response for email '%s'", request.original_email.subject)
         try:
             result = await self.provider.generate_response(request)
             logger.info("✅ Response generation completed successfully")
             return result
         except Exception as e:
-            logger.error(f"❌ AI Service response generation failed: {str(e)}")
+            logger.error("❌ AI Service response generation failed: %s", e)
             raise
     
+    @property
+    def gmail_service(self):
+        """Gmail service used for signature extraction, if any."""
+        return self.provider.signature_extractor.gmail_service
+    
+    def reset_reply_name(self):
+        """Drop the cached reply sender name so the next reply re-reads the Gmail profile."""
+        self.provider.signature_extractor.reset_reply_name()
+    
     def get_provider_name(self) -> str:
         """Get the name of the current AI provider."""
-        logger.debug("📋 Returning AI provider name: claude")
-        return "claude"
+        return self.provider_name
+    
+    def cleanup_summary_cache(self) -> int:
+        """Drop expired cached summaries and return how many were removed."""
+        return self.provider.summary_cache.cleanup()
+    
+    def get_summary_cache_stats(self) -> Dict[str, Any]:
+        """Get summary cache hit/miss statistics for monitoring."""
+        return self.provider.summary_cache.get_stats()
     
     def get_prompt_versions(self) -> Dict[str, str]:
         """Get all prompt versions for monitoring and debugging."""
@@ -3,10 +3,11 @@ Email service for processing and managing emails.
 Follows Single Responsibility Principle - handles only email operations.
 """
 import logging
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional
+from operator import attrgetter
+from typing import Dict, Iterable, List, Optional
 import re
-from email.utils import parseaddr
 
 from app.models.email_models import (
     EmailContent, EmailDomain, DomainAnalysis, EmailPriority
@@ -14,11 +15,22 @@ from app.models.email_models import (
 from app.core.exceptions import (
     EmailProcessingException, InvalidEmailDomainException
 )
-from app.services.gmail_service import GmailService
+from app.services.gmail_service import GmailService, extract_sender_domain
 
 # Configure logger
 logger = logging.getLogger(__name__)
 
+_PRIORITY_WEIGHTS = (0.25, 0.5, 0.75, 1.0)
+_RECENCY_DECAY = 1.0 / 30
+
+
+@dataclass(slots=True)
+class _DomainAgg:
+    """Running per-domain totals for domain analysis."""
+    last_received: datetime
+    priority_sum: float = 0.0
+    count: int = 1
+
 
 class EmailService:
     """
@@ -26,14 +38,14 @@ class EmailService:
     Follows Interface Segregation Principle - focused interface.
     """
     
-    def __init__(self, session_id: Optional[str] = None):
+    def __init__(self, session_id: Optional[str] = None, gmail_service: Optional[GmailService] = None):
         """Initialize email service with Gmail integration."""
         logger.info("📧 Initializing Email Service...")
         try:
-            self.gmail_service = GmailService(session_id=session_id)
+            self.gmail_service = gmail_service or GmailService(session_id=session_id)
             logger.info("✅ Email Service initialized successfully with Gmail integration")
         except Exception as e:
-            logger.error(f"❌ Failed to initialize Email Service: {str(e)}")
+            logger.error("❌ Failed to initialize Email Service: %s", e)
             raise
     
     def extract_domain_from_email(self, email: str) -> str:
@@ -49,110 +61,92 @@ class EmailService:
         Raises:
             InvalidEmailDomainException: If email format is invalid
         """
-        logger.debug(f"🔍 Extracting domain from email: {email}")
-        
         try:
-            _, email_addr = parseaddr(email)
-            logger.debug(f"📝 Parsed email address: {email_addr}")
-            
-            if '@' not in email_addr:
-                logger.error(f"❌ Invalid email format - no @ symbol: {email}")
-                raise InvalidEmailDomainException(f"Invalid email format: {email}")
-            
-            domain = email_addr.split('@')[1].lower()
-            logger.debug(f"🌐 Extracted domain: {domain}")
-            
-            if not domain:
-                logger.error(f"❌ Empty domain in email: {email}")
-                raise InvalidEmailDomainException(f"Empty domain in email: {email}")
-            
-            logger.info(f"✅ Successfully extracted domain '{domain}' from email '{email}'")
-            return domain
-            
+            return extract_sender_domain(email)
         except Exception as e:
-            logger.error(f"❌ Failed to extract domain from {email}: {str(e)}")
+            logger.error("❌ Failed to extract domain from %s: %s", email, e)
             raise InvalidEmailDomainException(f"Failed to extract domain: {str(e)}")
     
-    def analyze_email_domains(self, emails: List[EmailContent]) -> DomainAnalysis:
+    def analyze_email_domains(self, emails: Iterable[EmailContent]) -> DomainAnalysis:
         """
         Analyze email domains and calculate importance scores.
         
         Args:
-            emails: List of email content objects
+            emails: Email content objects; consumed in one pass, so a generator works
             
         Returns:
             Domain analysis with importance scores
         """
-        logger.info(f"📊 Starting domain analysis for {len(emails)} emails...")
+        logger.info("📊 Starting domain analysis...")
         
         try:
-            domain_stats: Dict[str, Dict[str, Any]] = {}
+            domain_stats: Dict[str, _DomainAgg] = {}
             
-            for i, email in enumerate(emails):
+            # Single grouping pass: only a lookup and a few additions per email
+            weights = _PRIORITY_WEIGHTS
+            for email in emails:
                 domain = email.domain
-                logger.debug(f"📧 Processing email {i+1}/{len(emails)} from domain: {domain}")
-                
-                if domain not in domain_stats:
-                    logger.debug(f"🆕 New domain discovered: {domain}")
-                    domain_stats[domain] = {
-                        'count': 0,
-                        'last_received': email.received_date,
-                        'priority_sum': 0
-                    }
+                received = email.received_date
+                stats = domain_stats.get(domain)
+                if stats is None:
+                    domain_stats[domain] = _DomainAgg(
+                        last_received=received,
+                        priority_sum=weights[email.priority]
+                    )
+                    continue
                 
-                domain_stats[domain]['count'] += 1
-                domain_stats[domain]['priority_sum'] += self._get_priority_weight(email.priority)
-                
-                if email.received_date > domain_stats[domain]['last_received']:
-                    domain_stats[domain]['last_received'] = email.received_date
-            
-            logger.info(f"📋 Found {len(domain_stats)} unique domains")
-            
-            # Calculate importance scores
-            total_emails = len(emails)
+                stats.count += 1
+                stats.priority_sum += weights[email.priority]
+                if received > stats.last_received:
+                    stats.last_received = received
+            
+            # Only per-domain totals are kept, so the email count comes from them
+            total_emails = sum(stats.count for stats in domain_stats.values())
+            logger.info("📋 Found %d unique domains in %d emails", len(domain_stats), total_emails)
+            
+            # Calculate importance scores against a single reference time
+            inv_total = 1.0 / total_emails
+            now = datetime.now()
             domains = []
             
             for domain, stats in domain_stats.items():
-                logger.debug(f"📈 Calculating importance score for domain: {domain}")
-                
                 # Importance based on frequency, recency, and priority
-                frequency_score = stats['count'] / total_emails
-                avg_priority = stats['priority_sum'] / stats['count']
+                frequency_score = stats.count * inv_total
+                avg_priority = stats.priority_sum / stats.count
                 
                 # Recency score (higher for more recent emails)
-                days_since_last = (datetime.now() - stats['last_received']).days
-                recency_score = max(0, 1 - (days_since_last / 30))  # Decay over 30 days
+                days_since_last = (now - stats.last_received).days
+                recency_score = max(0.0, 1.0 - days_since_last * _RECENCY_DECAY)  # Decay over 30 days
                 
-                importance_score = min(1.0, (frequency_score * 0.4 + 
-                                            avg_priority * 0.4 + 
-                                            recency_score * 0.2))
+                importance_score = frequency_score * 0.4 + avg_priority * 0.4 + recency_score * 0.2
+                if importance_score > 1.0:
+                    importance_score = 1.0
                 
-                logger.debug(f"📊 Domain {domain}: count={stats['count']}, freq={frequency_score:.3f}, "
-                           f"avg_priority={avg_priority:.3f}, recency={recency_score:.3f}, "
-                           f"importance={importance_score:.3f}")
+                logger.debug("📊 Domain %s: count=%d, freq=%.3f, avg_priority=%.3f, recency=%.3f, importance=%.3f",
+                             domain, stats.count, frequency_score, avg_priority, recency_score, importance_score)
                 
                 domains.append(EmailDomain(
                     domain=domain,
-                    count=stats['count'],
+                    count=stats.count,
                     importance_score=round(importance_score, 3),
-                    last_received=stats['last_received']
+                    last_received=stats.last_received
                 ))
             
             # Sort by importance score descending
-            domains.sort(key=lambda x: x.importance_score, reverse=True)
-            logger.info(f"🏆 Top domain by importance: {domains[0].domain} (score: {domains[0].importance_score})")
+            domains.sort(key=attrgetter('importance_score'), reverse=True)
+            logger.info("🏆 Top domain by importance: %s (score: %s)", domains[0].domain, domains[0].importance_score)
             
             analysis = DomainAnalysis(
                 domains=domains,
                 total_emails=total_emails,
-                analysis_date=datetime.now()
+                analysis_date=now
             )
             
-            logger.info(f"✅ Domain analysis completed successfully")
+            logger.info("✅ Domain analysis completed successfully")
             return analysis
             
         except Exception as e:
-            logger.error(f"❌ Failed to analyze domains: {str(e)}", exc_info=True)
+            logger.error("❌ Failed to analyze domains: %s", e, exc_info=True)
             raise EmailProcessingException(f"Failed to analyze domains: {str(e)}")
     
     def get_emails_by_domain(self, domain: str, limit: int = 20) -> List[EmailContent]:
@@ -166,21 +160,17 @@ class EmailService:
         Returns:
             List of emails from the domain
         """
-        logger.info(f"📬 Retrieving emails from domain '{domain}' (limit: {limit})")
+        logger.info("📬 Retrieving emails from domain '%s' (limit: %s)", domain, limit)
         
         try:
-            if not self.gmail_service.is_authenticated():
-                logger.error("❌ Gmail authentication required for email retrieval")
-                raise EmailProcessingException("Gmail authentication required. Please authenticate first.")
-            
-            logger.debug("✅ Gmail authentication verified")
+            self._require_auth("email retrieval")
             emails = self.gmail_service.get_emails_by_domain(domain, limit)
             
-            logger.info(f"✅ Retrieved {len(emails)} emails from domain '{domain}'")
+            logger.info("✅ Retrieved %s emails from domain '%s'", len(emails), domain)
             return emails
             
         except Exception as e:
-            logger.error(f"❌ Failed to get emails for domain {domain}: {str(e)}")
+            logger.error("❌ Failed to get emails for domain %s: %s", domain, e)
             raise EmailProcessingException(f"Failed to get emails for domain {domain}: {str(e)}")
     
     def get_all_domains(self) -> List[EmailDomain]:
@@ -188,18 +178,14 @@ class EmailService:
         logger.info("📋 Retrieving all email domains...")
         
         try:
-            if not self.gmail_service.is_authenticated():
-                logger.error("❌ Gmail authentication required for domain retrieval")
-                raise EmailProcessingException("Gmail authentication required. Please authenticate first.")
-            
-            logger.debug("✅ Gmail authentication verified")
+            self._require_auth("domain retrieval")
             domains = self.gmail_service.get_all_domains()
             
-            logger.info(f"✅ Retrieved {len(domains)} domains from Gmail service")
+            logger.info("✅ Retrieved %s domains from Gmail service", len(domains))
             return domains
             
         except Exception as e:
-            logger.error(f"❌ Failed to get email domains: {str(e)}")
+            logger.error("❌ Failed to get email domains: %s", e)
             raise EmailProcessingException(f"Failed to get email domains: {str(e)}")
     
     def get_email_by_id(self, message_id: str) -> EmailContent:
@@ -212,21 +198,17 @@ class EmailService:
         Returns:
             Full email content with body
         """
-        logger.info(f"📧 Retrieving full email content for message ID: {message_id}")
+        logger.info("📧 Retrieving full email content for message ID: %s", message_id)
         
         try:
-            if not self.gmail_service.is_authenticated():
-                logger.error("❌ Gmail authentication required for email retrieval")
-                raise EmailProcessingException("Gmail authentication required. Please authenticate first.")
-            
-            logger.debug("✅ Gmail authentication verified")
+            self._require_auth("email retrieval")
             email = self.gmail_service.get_email_by_id(message_id)
             
-            logger.info(f"✅ Retrieved full email content for: {email.subject}")
+            logger.info("✅ Retrieved full email content for: %s", email.subject)
             return email
             
         except Exception as e:
-            logger.error(f"❌ Failed to get email {message_id}: {str(e)}")
+            logger.error("❌ Failed to get email %s: %s", message_id, e)
             raise EmailProcessingException(f"Failed to get email {message_id}: {str(e)}")
     
     def send_reply(self, original_email: EmailContent, reply_body: str) -> bool:
@@ -240,15 +222,11 @@ class EmailService:
         Returns:
             True if sent successfully
         """
-        logger.info(f"📤 Sending reply to email '{original_email.subject}' from {original_email.sender}")
-        logger.debug(f"📝 Reply body length: {len(reply_body)} characters")
+        logger.info("📤 Sending reply to email '%s' from %s", original_email.subject, original_email.sender)
+        logger.debug("📝 Reply body length: %s characters", len(reply_body))
         
         try:
-            if not self.gmail_service.is_authenticated():
-                logger.error("❌ Gmail authentication required for sending replies")
-                raise EmailProcessingException("Gmail authentication required. Please authenticate first.")
-            
-            logger.debug("✅ Gmail authentication verified")
+            self._require_auth("sending replies")
             result = self.gmail_service.send_reply(original_email, reply_body)
             
             if result:
@@ -259,17 +237,19 @@ class EmailService:
             return result
             
         except Exception as e:
-            logger.error(f"❌ Failed to send reply: {str(e)}")
+            logger.error("❌ Failed to send reply: %s", e)
             raise EmailProcessingException(f"Failed to send reply: {str(e)}")
     
+    def _require_auth(self, operation: str):
+        """Raise if the Gmail service is not authenticated."""
+        if not self.gmail_service.is_authenticated():
+            logger.error("❌ Gmail authentication required for %s", operation)
+            raise EmailProcessingException("Gmail authentication required. Please authenticate first.")
+        logger.debug("✅ Gmail authentication verified")
+    
     def _get_priority_weight(self, priority: EmailPriority) -> float:
         """Get numeric weight for email priority."""
-        weights = {
-            EmailPriority.LOW: 0.25,
-            EmailPriority.MEDIUM: 0.5,
-            EmailPriority.HIGH: 0.75,
-            EmailPriority.URGENT: 1.0
-        }
-        weight = weights.get(priority, 0.5)
-        logger.debug(f"🎯 Priority {priority} mapped to weight {weight}")
+        # Indexed by the integer priority value (LOW..URGENT)
+        weight = _PRIORITY_WEIGHTS[priority]
+        logger.debug("🎯 Priority %s mapped to weight %s", priority.label, weight)
         return weight 
\ No newline at end of file
@@ -3,19 +3,29 @@ Gmail service for OAuth2 authentication and email operations.
 Follows Single Responsibility Principle - handles only Gmail operations.
 """
 import os
-import json
 import base64
+import hashlib
 import logging
+import random
+import re
+import threading
+import time
 from datetime import datetime, timedelta, timezone
-from typing import List, Dict, Any, Optional
+from email.utils import parseaddr, parsedate_tz
+from functools import lru_cache
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 
+import orjson
+
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import Flow
-from googleapiclient.discovery import build
+from googleapiclient import discovery_cache
+from googleapiclient.discovery import build_from_document
 from googleapiclient.errors import HttpError
+from googleapiclient.model import JsonModel
 
 from app.models.email_models import EmailContent, EmailDomain, DomainAnalysis, EmailPriority
 from app.core.config import get_settings
@@ -23,15 +33,128 @@ from app.core.exceptions import EmailProcessingException, InvalidEmailDomainExce
 
 logger = logging.getLogger(__name__)
 
+# Get settings instance
+settings = get_settings()
+
+# Trailing <user@host> of a From header
+_ANGLE_ADDR_RE = re.compile(r'<([^<>@\s]+@[^<>@\s]+)>$')
+
+
+@lru_cache(maxsize=4096)
+def extract_sender_domain(email: str) -> str:
+    """Parse the lowercased domain out of a sender string; inboxes repeat senders a lot."""
+    email_addr = email.strip()
+    if '<' in email_addr or '"' in email_addr or ' ' in email_addr:
+        # The usual Name <foo@bar.com> form is read directly; anything odder gets the full header parser
+        match = _ANGLE_ADDR_RE.search(email_addr)
+        if match:
+            email_addr = match.group(1)
+        else:
+            _, email_addr = parseaddr(email_addr)
+    
+    _, sep, domain = email_addr.rpartition('@')
+    if not sep:
+        raise InvalidEmailDomainException(f"Invalid email format: {email}")
+    
+    domain = domain.lower()
+    if not domain:
+        raise InvalidEmailDomainException(f"Empty domain in email: {email}")
+    return domain
+
+
+
+class _OrjsonModel(JsonModel):
+    """Gmail response model that parses bodies with orjson instead of the stdlib json."""
+    
+    def deserialize(self, content):
+        try:
+            body = orjson.loads(content)
+        except orjson.JSONDecodeError:
+            return content.decode('utf-8') if isinstance(content, bytes) else content
+        if self._data_wrapper and "data" in body:
+            body = body["data"]
+        return body
+
+
+_JSON_MODEL = _OrjsonModel()
+
+
+@lru_cache(maxsize=1)
+def _gmail_discovery_doc() -> bytes:
+    """The discovery document bundled with googleapiclient, read once per process."""
+    return discovery_cache.get_static_doc('gmail', 'v1').encode()
+
+
+def _build_gmail(creds: Credentials):
+    """Build the Gmail API client; every response, batched or not, goes through orjson."""
+    # build() re-reads the document and opens a throwaway HTTP client on every call; each
+    # client still gets a fresh parsed copy, since googleapiclient edits it while building
+    return build_from_document(orjson.loads(_gmail_discovery_doc()), credentials=creds, model=_JSON_MODEL)
+
+# Gmail accepts up to 100 calls per batch, but larger batches are rate limited
+_BATCH_SIZE = 50
+_EMAIL_HEADERS = ('subject', 'from', 'to', 'date')
+_EMAIL_HEADER_SET = frozenset(_EMAIL_HEADERS)
+_MAX_HEADER_NAME_LENGTH = max(map(len, _EMAIL_HEADERS))
+# Partial responses: only what _email_from_message and _extract_body read, so labels,
+# snippets, part headers and filenames are never sent or parsed. Three part levels
+# cover the usual multipart/mixed > multipart/alternative > multipart/related nesting.
+_FULL_MESSAGE_FIELDS = (
+    'id,payload(mimeType,headers,body/data,'
+    'parts(mimeType,body/data,parts(mimeType,body/data,parts(mimeType,body/data))))'
+)
+_METADATA_FIELDS = 'id,payload/headers'
+_LIST_FIELDS = 'messages/id,nextPageToken'
+# Messages listed and batch-fetched per page
+_PAGE_SIZE = 50
+# Largest page messages.list serves
+_LIST_MAX_RESULTS = 500
+# Per-message batch errors worth retrying, and how hard to try
+_RETRY_STATUSES = frozenset({429, 500, 503})
+_FETCH_ATTEMPTS = 3
+_BACKOFF_CAP = 4.0
+
+
+@lru_cache(maxsize=4096)
+def _ingest_domain(sender: str) -> str:
+    """Domain stored on EmailContent at ingest; 'unknown' when the sender has none."""
+    try:
+        return extract_sender_domain(sender)
+    except InvalidEmailDomainException:
+        return 'unknown'
+
+
+@lru_cache(maxsize=4096)
+def _parse_received_date(date_str: str) -> Optional[datetime]:
+    """Parse a Date header as a timezone-aware datetime, or None if it is malformed."""
+    # parsedate_tz gives the fields directly; missing or -0000 offsets are taken as UTC
+    parsed = parsedate_tz(date_str)
+    if parsed is None:
+        return None
+    offset = parsed[9]
+    try:
+        return datetime(*parsed[:6], tzinfo=timezone(timedelta(seconds=offset)) if offset else timezone.utc)
+    except (ValueError, OverflowError):
+        return None
+
+
+def _encode_raw(to: str, subject: str, body: str) -> str:
+    """Build a plain-text MIME message and encode it for the Gmail send API."""
+    message = MIMEText(body)
+    message['to'] = to
+    message['subject'] = subject
+    return base64.urlsafe_b64encode(message.as_bytes()).decode('ascii')
+
 
 class GmailService:
     """
     Gmail service for OAuth2 authentication and email operations.
     """
     
-    def __init__(self, session_id: Optional[str] = None):
-        """Initialize Gmail service."""
+    def __init__(self, session_id: Optional[str] = None, auth_request: Optional[Request] = None):
+        """Initialize Gmail service, optionally sharing an HTTP transport for token refreshes."""
         self.session_id = session_id
+        self.auth_request = auth_request or Request()
         if session_id:
             self.credentials_file = f"gmail_credentials_{session_id}.json"
             self.token_file = f"gmail_token_{session_id}.json"
@@ -41,7 +164,15 @@ class GmailService:
             self.token_file = "gmail_token.json"
         
         self.service = None
-        self.settings = get_settings()
+        self.settings = settings
+        self._last_token_hash: Optional[bytes] = None
+        # Recently fetched email and domain lists, keyed by call arguments: (fetched_at, items)
+        self._list_cache: Dict[tuple, Tuple[float, List[Any]]] = {}
+        # Endpoints run calls on worker threads; httplib2 connections are not thread-safe
+        self.lock = threading.RLock()
+        # OAuth flow built from the client secrets file, keyed by the file's mtime and scopes
+        self._flow: Optional[Flow] = None
+        self._flow_key: Optional[tuple] = None
         
         # Load existing credentials if available
         self._load_existing_credentials()
@@ -52,17 +183,17 @@ class GmailService:
             try:
                 creds = Credentials.from_authorized_user_file(self.token_file, self.settings.gmail_scopes)
                 if creds and creds.valid:
-                    self.service = build('gmail', 'v1', credentials=creds)
+                    self.service = _build_gmail(creds)
                 elif creds and creds.expired and creds.refresh_token:
-                    creds.refresh(Request())
-                    self.service = build('gmail', 'v1', credentials=creds)
+                    creds.refresh(self.auth_request)
+                    self.service = _build_gmail(creds)
                     self._save_credentials(creds)
                 else:
-                    print(f"Invalid credentials: missing refresh_token or invalid state")
+                    logger.warning("⚠️ Invalid credentials: missing refresh_token or invalid state")
                     # Delete invalid token file to force re-authentication
                     os.remove(self.token_file)
             except Exception as e:
-                print(f"Error loading existing credentials: {e}")
+                logger.error("❌ Error loading existing credentials: %s", e)
                 # Clean up corrupted token file
                 if os.path.exists(self.token_file):
                     os.remove(self.token_file)
@@ -82,28 +213,46 @@ class GmailService:
             }
         }
         
-        with open(self.credentials_file, 'w') as f:
-            json.dump(credentials, f, indent=2)
+        with open(self.credentials_file, 'wb') as f:
+            f.write(orjson.dumps(credentials, option=orjson.OPT_INDENT_2))
     
     def _save_credentials(self, creds: Credentials):
-        """Save credentials to file."""
-        with open(self.token_file, 'w') as f:
-            f.write(creds.to_json())
+        """Save credentials to file, skipping the write when they have not changed."""
+        token_json = creds.to_json()
+        token_hash = hashlib.blake2b(token_json.encode(), digest_size=8).digest()
+        if token_hash == self._last_token_hash and os.path.exists(self.token_file):
+            return
+        
+        # Write beside the target and swap it in, so readers never see a partial token file.
+        # The temporary name still matches the startup cleanup glob if a write is interrupted.
+        temp_file = f"{os.path.splitext(self.token_file)[0]}.tmp.json"
+        with open(temp_file, 'w') as f:
+            f.write(token_json)
+        os.replace(temp_file, self.token_file)
+        self._last_token_hash = token_hash
+    
+    def _get_flow(self) -> Flow:
+        """Return the OAuth flow, re-reading the client secrets file only when it changed."""
+        # Create credentials file if not exists
+        if not os.path.exists(self.credentials_file):
+            self._create_credentials_file()
+        
+        flow_key = (os.stat(self.credentials_file).st_mtime_ns, self.settings.gmail_scopes)
+        if self._flow is None or self._flow_key != flow_key:
+            self._flow = Flow.from_client_secrets_file(
+                self.credentials_file,
+                scopes=self.settings.gmail_scopes,
+                redirect_uri=self.settings.gmail_redirect_uri
+            )
+            self._flow_key = flow_key
+        return self._flow
     
     def get_auth_url(self) -> str:
         """Get Gmail OAuth2 authorization URL."""
         if not self.settings.gmail_client_id or not self.settings.gmail_client_secret:
             raise EmailProcessingException("Gmail OAuth2 credentials not configured")
         
-        # Create credentials file if not exists
-        if not os.path.exists(self.credentials_file):
-            self._create_credentials_file()
-        
-        flow = Flow.from_client_secrets_file(
-            self.credentials_file,
-            scopes=self.settings.gmail_scopes,
-            redirect_uri=self.settings.gmail_redirect_uri
-        )
+        flow = self._get_flow()
         
         # Include session ID in state parameter to link callback to correct session
         state_data = self.session_id if self.session_id else "no_session"
@@ -121,15 +270,7 @@ class GmailService:
     def authenticate_with_code(self, auth_code: str) -> bool:
         """Authenticate with authorization code and save credentials."""
         try:
-            if not os.path.exists(self.credentials_file):
-                self._create_credentials_file()
-            
-            flow = Flow.from_client_secrets_file(
-                self.credentials_file,
-                scopes=self.settings.gmail_scopes,
-                redirect_uri=self.settings.gmail_redirect_uri
-            )
-            
+            flow = self._get_flow()
             flow.fetch_token(code=auth_code)
             creds = flow.credentials
             
@@ -137,7 +278,8 @@ class GmailService:
             self._save_credentials(creds)
             
             # Initialize service
-            self.service = build('gmail', 'v1', credentials=creds)
+            self.service = _build_gmail(creds)
+            self._list_cache.clear()
             
             return True
             
@@ -148,6 +290,25 @@ class GmailService:
         """Check if Gmail service is authenticated."""
         return self.service is not None
     
+    def close(self):
+        """Release the underlying Gmail API client and its HTTP connections."""
+        self._list_cache.clear()
+        if self.service is not None:
+            self.service.close()
+            self.service = None
+    
+    def _cached_list(self, key: tuple) -> Optional[List[Any]]:
+        """Return a copy of a list fetched within the cache TTL, if any."""
+        entry = self._list_cache.get(key)
+        if entry is not None and time.monotonic() - entry[0] < self.settings.gmail_list_cache_ttl:
+            return list(entry[1])
+        return None
+    
+    def _store_list(self, key: tuple, items: List[Any]) -> List[Any]:
+        """Remember a freshly fetched list and return a copy for the caller."""
+        self._list_cache[key] = (time.monotonic(), items)
+        return list(items)
+    
     def get_user_profile(self) -> Dict[str, Any]:
         """Get user profile information."""
         if not self.is_authenticated():
@@ -164,107 +325,164 @@ class GmailService:
             raise EmailProcessingException(f"Failed to get user profile: {str(e)}")
     
     def get_emails(self, max_results: int = 100) -> List[EmailContent]:
-        """Fetch emails from Gmail with performance optimizations."""
+        """Fetch emails from Gmail, reusing a recent listing of the same size; bodies come from get_email_by_id."""
+        cache_key = ('emails', max_results)
+        cached = self._cached_list(cache_key)
+        if cached is not None:
+            return cached
+        return self._store_list(cache_key, list(self.iter_emails(max_results)))
+    
+    def iter_emails(self, max_results: int = 100) -> Iterator[EmailContent]:
+        """Yield the most recent emails page by page with empty bodies, so callers can consume them incrementally."""
         if not self.is_authenticated():
             raise EmailProcessingException("Not authenticated with Gmail")
         
         try:
-            # Limit max results for performance (Gmail API is slow with large requests)
-            safe_max_results = min(max_results, 50)
-            
-            # Get list of messages
-            results = self.service.users().messages().list(
-                userId='me',
-                maxResults=safe_max_results
-            ).execute()
-            
-            messages = results.get('messages', [])
-            emails = []
-            
-            # Process only limited messages for better performance
-            for message in messages[:safe_max_results]:
-                try:
-                    # Get message with minimal format for faster processing
-                    msg = self.service.users().messages().get(
-                        userId='me',
-                        id=message['id'],
-                        format='full'  # We need full format for body extraction
-                    ).execute()
-                    
-                    # Extract email data
-                    headers = msg['payload'].get('headers', [])
-                    email_data = {}
-                    
-                    for header in headers:
-                        name = header['name'].lower()
-                        if name in ['subject', 'from', 'to', 'date']:
-                            email_data[name] = header['value']
-                    
-                    # Extract body
-                    body = self._extract_body(msg['payload'])
-                    
-                    if email_data.get('from') and email_data.get('subject'):
-                        # Parse date
-                        date_str = email_data.get('date', '')
-                        try:
-                            from email.utils import parsedate_to_datetime
-                            received_date = parsedate_to_datetime(date_str)
-                            # Ensure timezone awareness
-                            if received_date.tzinfo is None:
-                                received_date = received_date.replace(tzinfo=timezone.utc)
-                        except:
-                            received_date = datetime.now(timezone.utc)
-                        
-                        # Extract domain from sender
-                        sender_email = email_data['from']
-                        domain = sender_email.split('@')[-1] if '@' in sender_email else 'unknown'
-                        
-                        email_content = EmailContent(
-                            subject=email_data['subject'],
-                            body=body,
-                            sender=email_data['from'],
-                            recipient=email_data.get('to', ''),
-                            received_date=received_date,
-                            domain=domain,
-                            message_id=message['id']
-                        )
-                        
-                        emails.append(email_content)
-                        
-                except Exception as e:
-                    print(f"Error processing message {message['id']}: {e}")
-                    continue
-            
-            return emails
+            page_token = None
+            remaining = max_results
+            while remaining > 0:
+                # Each page is one list call plus one batched fetch
+                results = self.service.users().messages().list(
+                    userId='me',
+                    maxResults=min(remaining, _PAGE_SIZE),
+                    pageToken=page_token,
+                    fields=_LIST_FIELDS
+                ).execute()
+                
+                message_ids = [message['id'] for message in results.get('messages', [])][:remaining]
+                # Only headers are needed for listings; bodies are loaded on demand
+                yield from self._fetch_emails(
+                    message_ids,
+                    include_body=False,
+                    format='metadata',
+                    metadataHeaders=list(_EMAIL_HEADERS),
+                    fields=_METADATA_FIELDS
+                )
+                
+                remaining -= len(message_ids)
+                page_token = results.get('nextPageToken')
+                if not page_token or not message_ids:
+                    break
             
         except HttpError as e:
             raise EmailProcessingException(f"Failed to fetch emails: {str(e)}")
     
-    def _extract_body(self, payload: Dict[str, Any]) -> str:
-        """Extract email body from payload."""
-        body = ""
+    def _fetch_emails(self, message_ids: List[str], include_body: bool, **get_params) -> List[EmailContent]:
+        """Fetch and parse messages through batched HTTP requests, keeping the given order."""
+        emails: Dict[str, EmailContent] = {}
+        retry_ids: List[str] = []
         
-        if 'parts' in payload:
-            for part in payload['parts']:
-                if part['mimeType'] == 'text/plain':
-                    data = part['body'].get('data', '')
-                    if data:
-                        body += base64.urlsafe_b64decode(data).decode('utf-8')
-                elif part['mimeType'] == 'text/html' and not body:
-                    data = part['body'].get('data', '')
-                    if data:
-                        body += base64.urlsafe_b64decode(data).decode('utf-8')
+        def collect(request_id, response, exception):
+            # Runs as each batched response is read; per-message failures are skipped
+            if exception is not None:
+                if isinstance(exception, HttpError) and exception.resp.status in _RETRY_STATUSES:
+                    retry_ids.append(request_id)
+                else:
+                    logger.debug("⚠️ Error processing message %s: %s", request_id, exception)
+                return
+            try:
+                email = self._email_from_message(response, include_body)
+            except Exception as e:
+                logger.debug("⚠️ Error processing message %s: %s", request_id, e)
+                return
+            if email is not None:
+                emails[request_id] = email
+        
+        messages_api = self.service.users().messages()
+        pending = message_ids
+        for attempt in range(_FETCH_ATTEMPTS):
+            if attempt:
+                # Rate limited or transient server error: back off with jitter, then retry only those
+                time.sleep(min(_BACKOFF_CAP, 2 ** (attempt - 1)) + random.random() * 0.5)
+            for start in range(0, len(pending), _BATCH_SIZE):
+                batch = self.service.new_batch_http_request(callback=collect)
+                for message_id in pending[start:start + _BATCH_SIZE]:
+                    batch.add(messages_api.get(userId='me', id=message_id, **get_params), request_id=message_id)
+                batch.execute()
+            if not retry_ids:
+                break
+            pending, retry_ids = retry_ids, []
         else:
-            if payload['mimeType'] == 'text/plain':
-                data = payload['body'].get('data', '')
-                if data:
-                    body = base64.urlsafe_b64decode(data).decode('utf-8')
-            elif payload['mimeType'] == 'text/html':
-                data = payload['body'].get('data', '')
-                if data:
-                    body = base64.urlsafe_b64decode(data).decode('utf-8')
+            logger.warning("⚠️ Giving up on %s messages after %s rate-limited attempts", len(pending), _FETCH_ATTEMPTS)
         
-        return body.strip()
+        return [emails[message_id] for message_id in message_ids if message_id in emails]
+    
+    def _email_from_message(self, msg: Dict[str, Any], include_body: bool) -> Optional[EmailContent]:
+        """Build an EmailContent from a Gmail message resource, or None if it lacks sender or subject."""
+        # Extract email data
+        headers = msg['payload'].get('headers', [])
+        email_data = {}
+        
+        for header in headers:
+            name = header['name']
+            # Longer names (Received, X-*, DKIM-Signature...) are never wanted, so skip lower() for them
+            if len(name) > _MAX_HEADER_NAME_LENGTH:
+                continue
+            name = name.lower()
+            if name in _EMAIL_HEADER_SET:
+                email_data[name] = header['value']
+                # Full-format messages carry dozens of Received/X- headers after these
+                if len(email_data) == len(_EMAIL_HEADERS):
+                    break
+        
+        if not (email_data.get('from') and email_data.get('subject')):
+            return None
+        
+        # Unparseable dates fall back to now, which must not be cached
+        received_date = _parse_received_date(email_data.get('date', '')) or datetime.now(timezone.utc)
+        
+        return EmailContent(
+            subject=email_data['subject'],
+            body=self._extract_body(msg['payload']) if include_body else "",
+            sender=email_data['from'],
+            recipient=email_data.get('to', ''),
+            received_date=received_date,
+            domain=_ingest_domain(email_data['from']),
+            message_id=msg['id']
+        )
+    
+    def _extract_body(self, payload: Dict[str, Any]) -> str:
+        """Extract the text/plain parts at the shallowest MIME level that has any, falling back to text/html."""
+        html_data = None
+        level = [payload]
+        while level:
+            text_parts = []
+            next_level = []
+            for part in level:
+                mime_type = part.get('mimeType', '')
+                if mime_type == 'text/plain':
+                    data = part.get('body', {}).get('data')
+                    if data:
+                        text_parts.append(data)
+                elif mime_type == 'text/html' and html_data is None:
+                    html_data = part.get('body', {}).get('data') or None
+                elif 'parts' in part:
+                    next_level.extend(part['parts'])
+            
+            if text_parts:
+                # Sibling text parts (e.g. inline text around an attachment) all belong to the body
+                max_chars = self.settings.max_email_length
+                decoded = []
+                length = 0
+                for data in text_parts:
+                    text = self._decode_body(data)
+                    decoded.append(text)
+                    length += len(text) + 1
+                    if length > max_chars:
+                        break
+                return "\n".join(decoded)[:max_chars]
+            level = next_level
+        
+        return self._decode_body(html_data) if html_data else ""
+    
+    def _decode_body(self, data: str) -> str:
+        """Decode a base64url body part, only as far as max_email_length characters need."""
+        max_chars = self.settings.max_email_length
+        # UTF-8 is at most 4 bytes per character; whole 4-char base64 groups decode on their own
+        max_bytes = max_chars * 4
+        raw = base64.urlsafe_b64decode(data[:(max_bytes // 3 + 1) * 4])[:max_bytes]
+        # 'ignore' also drops a multi-byte character cut in half by the slice
+        return raw.decode('utf-8', 'ignore').strip()[:max_chars]
     
     def send_email(self, to: str, subject: str, body: str) -> bool:
         """Send email via Gmail."""
@@ -272,16 +490,12 @@ class GmailService:
             raise EmailProcessingException("Not authenticated with Gmail")
         
         try:
-            message = MIMEText(body)
-            message['to'] = to
-            message['subject'] = subject
-            
-            raw_message = base64.urlsafe_b64encode(message.as_bytes()).decode('utf-8')
-            
             self.service.users().messages().send(
                 userId='me',
-                body={'raw': raw_message}
+                body={'raw': _encode_raw(to, subject, body)}
             ).execute()
+            # The sent message shows up in the mailbox listing
+            self._list_cache.clear()
             
             return True
             
@@ -294,35 +508,31 @@ class GmailService:
             raise EmailProcessingException("Not authenticated with Gmail")
         
         try:
-            # Create reply message
-            message = MIMEText(reply_body)
-            message['to'] = original_email.sender
-            
-            # Create reply subject (add "Re: " if not already present)
-            original_subject = original_email.subject
-            if not original_subject.lower().startswith('re:'):
-                reply_subject = f"Re: {original_subject}"
-            else:
-                reply_subject = original_subject
-            
-            message['subject'] = reply_subject
-            
-            # Set In-Reply-To and References headers for proper threading
-            # Note: In a full implementation, we'd need the original message ID
-            # For now, we'll send as a regular email to the sender
-            
-            raw_message = base64.urlsafe_b64encode(message.as_bytes()).decode('utf-8')
-            
             self.service.users().messages().send(
                 userId='me',
-                body={'raw': raw_message}
+                body={'raw': self._build_reply_raw(original_email, reply_body)}
             ).execute()
+            # The sent message shows up in the mailbox listing
+            self._list_cache.clear()
             
             return True
             
         except HttpError as e:
             raise EmailProcessingException(f"Failed to send reply: {str(e)}")
     
+    def _build_reply_raw(self, original_email: EmailContent, reply_body: str) -> str:
+        """Build the base64url-encoded MIME reply to an email."""
+        # Create reply subject (add "Re: " if not already present)
+        original_subject = original_email.subject
+        if not original_subject.lower().startswith('re:'):
+            reply_subject = f"Re: {original_subject}"
+        else:
+            reply_subject = original_subject
+        
+        # No In-Reply-To/References: EmailContent has no RFC 822 Message-ID to thread on
+        
+        return _encode_raw(original_email.sender, reply_subject, reply_body)
+    
     def get_domains(self, emails: List[EmailContent]) -> List[EmailDomain]:
         """Analyze email domains and return domain statistics."""
         domain_stats = {}
@@ -334,38 +544,30 @@ class GmailService:
                 return dt.replace(tzinfo=timezone.utc)
             return dt
         
+        # Per domain: [count, last_received], updated through one lookup per email
         for email in emails:
-            domain = email.domain
             normalized_date = normalize_datetime(email.received_date)
-            
-            if domain not in domain_stats:
-                domain_stats[domain] = {
-                    'count': 0,
-                    'last_received': normalized_date,
-                    'importance_score': 0.5  # Default importance
-                }
-            
-            domain_stats[domain]['count'] += 1
-            if normalized_date > domain_stats[domain]['last_received']:
-                domain_stats[domain]['last_received'] = normalized_date
+            stats = domain_stats.get(email.domain)
+            if stats is None:
+                domain_stats[email.domain] = [1, normalized_date]
+                continue
+            
+            stats[0] += 1
+            if normalized_date > stats[1]:
+                stats[1] = normalized_date
         
         # Calculate importance scores based on frequency and recency
         total_emails = len(emails)
-        current_time = datetime.now(timezone.utc)
-        
-        for domain, stats in domain_stats.items():
-            frequency_score = stats['count'] / total_emails
-            recency_score = 1.0 if stats['last_received'] > current_time - timedelta(days=7) else 0.5
-            stats['importance_score'] = (frequency_score * 0.7) + (recency_score * 0.3)
+        recent_cutoff = datetime.now(timezone.utc) - timedelta(days=7)
         
         return [
             EmailDomain(
                 domain=domain,
-                count=stats['count'],
-                importance_score=stats['importance_score'],
-                last_received=stats['last_received']
+                count=count,
+                importance_score=(count / total_emails * 0.7) + ((1.0 if last_received > recent_cutoff else 0.5) * 0.3),
+                last_received=last_received
             )
-            for domain, stats in domain_stats.items()
+            for domain, (count, last_received) in domain_stats.items()
         ]
     
     def get_emails_by_domain(self, domain: str, limit: int = 20) -> List[EmailContent]:
@@ -374,6 +576,11 @@ class GmailService:
             raise EmailProcessingException("Gmail authentication required. Please authenticate first.")
         
         try:
+            cache_key = ('domain', domain, limit)
+            cached = self._cached_list(cache_key)
+            if cached is not None:
+                return cached
+            
             # Use Gmail search query to filter by domain - much faster!
             search_query = f"from:{domain}"
             
@@ -381,68 +588,21 @@ class GmailService:
             results = self.service.users().messages().list(
                 userId='me',
                 q=search_query,
-                maxResults=min(limit, 50)  # Limit to prevent slowness
+                # Fetches are batched, so the only cap left is Gmail's per-page maximum
+                maxResults=min(limit, _LIST_MAX_RESULTS),
+                fields=_LIST_FIELDS
             ).execute()
             
             messages = results.get('messages', [])
-            emails = []
-            
-            # Process only the first few messages for speed
-            for message in messages[:limit]:
-                try:
-                    # Get minimal message details for faster processing
-                    msg = self.service.users().messages().get(
-                        userId='me',
-                        id=message['id'],
-                        format='metadata',  # Only get headers, not full body for speed
-                        metadataHeaders=['subject', 'from', 'to', 'date']
-                    ).execute()
-                    
-                    # Extract email data from metadata
-                    headers = msg['payload'].get('headers', [])
-                    email_data = {}
-                    
-                    for header in headers:
-                        name = header['name'].lower()
-                        if name in ['subject', 'from', 'to', 'date']:
-                            email_data[name] = header['value']
-                    
-                    if email_data.get('from') and email_data.get('subject'):
-                        # Parse date
-                        date_str = email_data.get('date', '')
-                        try:
-                            from email.utils import parsedate_to_datetime
-                            received_date = parsedate_to_datetime(date_str)
-                            # Ensure timezone awareness
-                            if received_date.tzinfo is None:
-                                received_date = received_date.replace(tzinfo=timezone.utc)
-                        except:
-                            received_date = datetime.now(timezone.utc)
-                        
-                        # Extract domain from sender
-                        sender_email = email_data['from']
-                        email_domain = sender_email.split('@')[-1] if '@' in sender_email else 'unknown'
-                        if '<' in sender_email and '>' in sender_email:
-                            email_address_part = sender_email.split('<')[1].split('>')[0]
-                            email_domain = email_address_part.split('@')[-1] if '@' in email_address_part else 'unknown'
-                        
-                        email_content = EmailContent(
-                            subject=email_data['subject'],
-                            body="",  # Empty body for list view - will be loaded on demand
-                            sender=email_data['from'],
-                            recipient=email_data.get('to', ''),
-                            received_date=received_date,
-                            domain=email_domain,
-                            message_id=message['id']  # Store Gmail message ID for on-demand loading
-                        )
-                        
-                        emails.append(email_content)
-                        
-                except Exception as e:
-                    print(f"Error processing message {message['id']}: {e}")
-                    continue
             
-            return emails
+            # Only headers are needed for the list view; bodies are loaded on demand
+            return self._store_list(cache_key, self._fetch_emails(
+                [message['id'] for message in messages[:limit]],
+                include_body=False,
+                format='metadata',
+                metadataHeaders=list(_EMAIL_HEADERS),
+                fields=_METADATA_FIELDS
+            ))
             
         except Exception as e:
             raise EmailProcessingException(f"Failed to get emails for domain {domain}: {str(e)}")
@@ -457,48 +617,13 @@ class GmailService:
             msg = self.service.users().messages().get(
                 userId='me',
                 id=message_id,
-                format='full'
+                format='full',
+                fields=_FULL_MESSAGE_FIELDS
             ).execute()
             
-            # Extract email data
-            headers = msg['payload'].get('headers', [])
-            email_data = {}
-            
-            for header in headers:
-                name = header['name'].lower()
-                if name in ['subject', 'from', 'to', 'date']:
-                    email_data[name] = header['value']
-            
-            # Extract full body
-            body = self._extract_body(msg['payload'])
-            
-            if email_data.get('from') and email_data.get('subject'):
-                # Parse date
-                date_str = email_data.get('date', '')
-                try:
-                    from email.utils import parsedate_to_datetime
-                    received_date = parsedate_to_datetime(date_str)
-                    if received_date.tzinfo is None:
-                        received_date = received_date.replace(tzinfo=timezone.utc)
-                except:
-                    received_date = datetime.now(timezone.utc)
-                
-                # Extract domain from sender
-                sender_email = email_data['from']
-                domain = sender_email.split('@')[-1] if '@' in sender_email else 'unknown'
-                if '<' in sender_email and '>' in sender_email:
-                    email_address_part = sender_email.split('<')[1].split('>')[0]
-                    domain = email_address_part.split('@')[-1] if '@' in email_address_part else 'unknown'
-                
-                return EmailContent(
-                    subject=email_data['subject'],
-                    body=body,
-                    sender=email_data['from'],
-                    recipient=email_data.get('to', ''),
-                    received_date=received_date,
-                    domain=domain,
-                    message_id=message_id
-                )
+            email = self._email_from_message(msg, include_body=True)
+            if email is not None:
+                return email
             
             raise EmailProcessingException("Email missing required fields")
             
@@ -511,53 +636,53 @@ class GmailService:
             raise EmailProcessingException("Gmail authentication required. Please authenticate first.")
         
         try:
+            cached = self._cached_list(('domains',))
+            if cached is not None:
+                logger.info("📊 Returning %s recently computed domains", len(cached))
+                return cached
+            
             logger.info("📊 Getting domains using representative sampling...")
             
             # Get a balanced sample for domain representation 
-            # 100 emails should give us good domain coverage without being too slow
-            sample_emails = self.get_emails(max_results=100)
-            
-            # Group emails by domain and count them
-            domain_stats = {}
-            for email in sample_emails:
-                domain = email.domain
-                if domain not in domain_stats:
-                    domain_stats[domain] = {
-                        'count': 0,
-                        'last_received': email.received_date,
-                        'emails': []
-                    }
-                
-                domain_stats[domain]['count'] += 1
-                domain_stats[domain]['emails'].append(email)
+            # 100 emails should give us good domain coverage without being too slow.
+            # Emails are grouped as each page arrives; only per-domain totals are kept.
+            # Per domain: [count, last_received], updated through one lookup per email
+            domain_stats: Dict[str, list] = {}
+            total_sample = 0
+            for email in self.iter_emails(max_results=100):
+                total_sample += 1
+                received = email.received_date
+                stats = domain_stats.get(email.domain)
+                if stats is None:
+                    domain_stats[email.domain] = [1, received]
+                    continue
                 
+                stats[0] += 1
                 # Update last received date
-                if email.received_date > domain_stats[domain]['last_received']:
-                    domain_stats[domain]['last_received'] = email.received_date
+                if received > stats[1]:
+                    stats[1] = received
             
-            logger.info(f"📊 Found {len(domain_stats)} domains from sample of {len(sample_emails)} emails")
+            logger.info("📊 Found %s domains from sample of %s emails", len(domain_stats), total_sample)
             
             domains_with_counts = []
-            total_sample = len(sample_emails)
+            current_time = datetime.now(timezone.utc)
+            # Recency buckets as cutoffs; timedelta.days floors, so "within 1 day" means under 2 days ago
+            within_1_day = current_time - timedelta(days=2)
+            within_7_days = current_time - timedelta(days=8)
+            within_30_days = current_time - timedelta(days=31)
             
             # Process each domain
-            for domain, stats in domain_stats.items():
+            for domain, (actual_count, last_received) in domain_stats.items():
                 try:
-                    actual_count = stats['count']  # Use sample count (more reliable)
-                    last_received = stats['last_received']
-                    
                     # Calculate importance score based on frequency and recency
-                    frequency_score = stats['count'] / total_sample
-                    
-                    current_time = datetime.now(timezone.utc)
-                    days_ago = (current_time - last_received).days
+                    frequency_score = actual_count / total_sample
                     
                     # Recency scoring: recent = high score
-                    if days_ago <= 1:
+                    if last_received > within_1_day:
                         recency_score = 1.0
-                    elif days_ago <= 7:
+                    elif last_received > within_7_days:
                         recency_score = 0.8
-                    elif days_ago <= 30:
+                    elif last_received > within_30_days:
                         recency_score = 0.5
                     else:
                         recency_score = 0.2
@@ -571,33 +696,35 @@ class GmailService:
                         last_received=last_received
                     ))
                     
-                    logger.debug(f"📊 Domain {domain}: {actual_count} emails, score={importance_score:.3f}")
+                    logger.debug("📊 Domain %s: %s emails, score=%.3f", domain, actual_count, importance_score)
                     
                 except Exception as e:
-                    logger.warning(f"Error processing domain {domain}: {e}")
+                    logger.warning("Error processing domain %s: %s", domain, e)
                     # Use basic data as fallback
                     domains_with_counts.append(EmailDomain(
                         domain=domain,
-                        count=stats['count'],
+                        count=actual_count,
                         importance_score=0.3,
-                        last_received=stats['last_received']
+                        last_received=last_received
                     ))
             
             # Sort by importance score, then by count (most important first)
             domains_with_counts.sort(key=lambda d: (d.importance_score, d.count), reverse=True)
             
-            logger.info(f"✅ Returning {len(domains_with_counts)} domains with sample-based counts")
-            return domains_with_counts
+            logger.info("✅ Returning %s domains with sample-based counts", len(domains_with_counts))
+            return self._store_list(('domains',), domains_with_counts)
             
         except Exception as e:
-            logger.error(f"❌ Failed to get domains: {str(e)}")
+            logger.error("❌ Failed to get domains: %s", e)
             raise EmailProcessingException(f"Failed to get email domains: {str(e)}")
     
     def logout(self):
         """Logout and clear all stored credentials."""
         self._clear_sessions()
+        self._list_cache.clear()
+        self._flow = None
         self.service = None
-        print("✅ Gmail service logged out and sessions cleared")
+        logger.info("✅ Gmail service logged out and sessions cleared")
     
     def _clear_sessions(self):
         """Clear all stored credentials and sessions."""
@@ -606,7 +733,7 @@ class GmailService:
             for file_path in files_to_remove:
                 if os.path.exists(file_path):
                     os.remove(file_path)
-                    print(f"🗑️ Cleared session file: {file_path}")
-            print("✅ All Gmail sessions cleared - fresh authentication required")
+                    logger.info("🗑️ Cleared session file: %s", file_path)
+            logger.info("✅ All Gmail sessions cleared - fresh authentication required")
         except Exception as e:
-            print(f"⚠️ Warning: Could not clear some session files: {e}")
+            logger.warning("⚠️ Could not clear some session files: %s", e)
@@ -2,46 +2,60 @@
 Application startup utilities.
 """
 import os
-import glob
 import logging
-from pathlib import Path
+
+from app.core.session_manager import session_manager
 
 logger = logging.getLogger(__name__)
 
+_LEGACY_SESSION_FILES = frozenset({"gmail_credentials.json", "gmail_token.json"})
+
+
+def _is_gmail_session_file(name: str) -> bool:
+    """Match gmail_credentials[_<session>].json and gmail_token[_<session>].json."""
+    if name in _LEGACY_SESSION_FILES:
+        return True
+    return name.endswith(".json") and name.startswith(("gmail_credentials_", "gmail_token_"))
+
+
 def clear_gmail_sessions():
     """Clear Gmail session files on application startup."""
     try:
-        # Clear global credential files (legacy)
-        files_to_remove = ["gmail_credentials.json", "gmail_token.json"]
+        # One directory pass covers the global (legacy) and session-specific credential files
         cleared_files = []
+        with os.scandir(".") as entries:
+            for entry in entries:
+                if _is_gmail_session_file(entry.name):
+                    try:
+                        os.unlink(entry.path)
+                        cleared_files.append(entry.name)
+                    except FileNotFoundError:
+                        pass
         
-        for file_path in files_to_remove:
-            if os.path.exists(file_path):
-                os.remove(file_path)
-                cleared_files.append(file_path)
-        
-        # Clear session-specific credential files
-        session_cred_files = glob.glob("gmail_credentials_*.json") + glob.glob("gmail_token_*.json")
-        for file_path in session_cred_files:
-            if os.path.exists(file_path):
-                os.remove(file_path)
-                cleared_files.append(file_path)
+        # Clear stored user sessions (force fresh authentication)
+        cleared_sessions = session_manager.clear_all_sessions()
         
-        # Clear old user session files (force fresh authentication)
-        user_sessions_dir = Path("user_sessions")
-        if user_sessions_dir.exists():
-            for session_file in user_sessions_dir.glob("*.json"):
-                try:
-                    session_file.unlink()
-                    cleared_files.append(str(session_file))
-                except Exception as e:
-                    logger.warning(f"Could not remove session file {session_file}: {e}")
+        # Remove session files left over from the old file-per-session store
+        try:
+            with os.scandir("user_sessions") as entries:
+                for entry in entries:
+                    if entry.name.endswith(".json"):
+                        try:
+                            os.unlink(entry.path)
+                            cleared_files.append(entry.path)
+                        except OSError as e:
+                            logger.warning("Could not remove session file %s: %s", entry.path, e)
+        except FileNotFoundError:
+            pass
         
-        if cleared_files:
-            logger.info(f"🗑️ Cleared Gmail session files on startup: {', '.join(cleared_files)}")
+        if cleared_files or cleared_sessions:
+            if cleared_files:
+                logger.info("🗑️ Cleared Gmail session files on startup: %s", ', '.join(cleared_files))
+            if cleared_sessions:
+                logger.info("🗑️ Cleared %s stored user sessions on startup", cleared_sessions)
             logger.info("✅ Fresh Gmail authentication required")
         else:
             logger.info("ℹ️ No Gmail session files found to clear")
             
     except Exception as e:
-        logger.warning(f"⚠️ Could not clear Gmail session files: {e}")
+        logger.warning("⚠️ Could not clear Gmail session files: %s", e)